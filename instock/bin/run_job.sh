@@ -20,4 +20,5 @@ echo 指标数据作业 python indicators_data_daily_job.py
 echo K线形态作业 klinepattern_data_daily_job.py
 echo 策略数据作业 python strategy_data_daily_job.py
 echo 回测数据 python backtest_data_daily_job.py
+echo 缓存清理作业 python cache_clean_job.py --budget-mb 2048
 echo ------正在执行作业中 请等待------
@@ -0,0 +1,3 @@
+#!/bin/bash
+
+/usr/local/bin/python3 /data/InStock/instock/job/spot_poll_job.py
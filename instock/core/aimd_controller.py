@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from instock.lib.singleton_type import singleton_type
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+AIMD_INITIAL_LIMIT = 4  # 每个主机初始允许的在途请求数
+AIMD_MIN_LIMIT = 1
+AIMD_MAX_LIMIT = 32
+AIMD_INCREASE = 1.0  # 每完成一个窗口的请求，在途上限加1
+AIMD_DECREASE = 0.5  # 被限流时在途上限乘以该系数
+AIMD_LATENCY_TOLERANCE = 2.0  # 延迟超过基线的倍数时不再增加并发
+AIMD_BACKOFF_BASE = 0.5  # 被限流后暂停发送的秒数，连续限流时翻倍
+AIMD_BACKOFF_MAX = 8.0
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+# 使用环境变量配置,docker -e 传递
+_aimd_max_limit = os.environ.get('http_max_concurrency')
+if _aimd_max_limit is not None:
+    AIMD_MAX_LIMIT = max(int(_aimd_max_limit), AIMD_MIN_LIMIT)
+
+
+def host_key(url):
+    """
+    并发窗口按协议+主机划分
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def is_throttled(status):
+    """
+    :param status: HTTP状态码，None表示超时或连接失败
+    """
+    return status is None or status in THROTTLE_STATUS
+
+
+# 单个主机的并发窗口
+class host_window:
+    def __init__(self):
+        self.limit = float(min(AIMD_INITIAL_LIMIT, AIMD_MAX_LIMIT))
+        self.in_flight = 0
+        self.latency = None  # 延迟的指数移动平均
+        self.baseline = None  # 延迟基线，取观察到的较低值
+        self.cooldown_until = 0.0
+        self.backoffs = 0  # 连续限流次数
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.cond = threading.Condition()
+
+    def to_dict(self):
+        return {
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'latency': round(self.latency, 4) if self.latency is not None else None,
+            'throttled': self.throttled,
+        }
+
+
+# 按主机的AIMD并发控制器，全部爬虫共用。
+# 延迟和错误率正常时在途上限线性增加；遇到429、5xx、超时时上限减半并短暂暂停发送，连续限流时暂停时间翻倍。
+# 请求前acquire取得许可，完成后release报告结果，在途数达到上限或处于暂停期时acquire阻塞等待。
+# 事件循环中用try_acquire不阻塞地取得许可，再在执行请求的线程中hold，该线程下一次acquire直接使用。
+class aimd_controller(metaclass=singleton_type):
+    def __init__(self):
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _window(self, host):
+        with self._lock:
+            window = self._windows.get(host)
+            if window is None:
+                window = self._windows[host] = host_window()
+        return window
+
+    def try_acquire(self, host):
+        """
+        不阻塞地取得许可
+        :return: 0表示已取得许可；处于暂停期时返回剩余秒数；在途数已满时返回None
+        """
+        window = self._window(host)
+        with window.cond:
+            wait = window.cooldown_until - time.monotonic()
+            if wait > 0:
+                return wait
+            if window.in_flight < int(window.limit):
+                window.in_flight += 1
+                return 0
+        return None
+
+    def hold(self, host):
+        """
+        在当前线程登记已经取得的许可，下一次acquire(host)直接使用
+        """
+        self._local.held = host
+
+    def unhold(self):
+        """
+        清除当前线程登记的许可，没有被请求用掉时归还，不计入延迟和限流统计
+        """
+        host = getattr(self._local, 'held', None)
+        self._local.held = None
+        if host is not None:
+            window = self._window(host)
+            with window.cond:
+                window.in_flight -= 1
+                window.cond.notify_all()
+
+    def acquire(self, host):
+        if getattr(self._local, 'held', None) == host:
+            self._local.held = None
+            return
+        window = self._window(host)
+        with window.cond:
+            while True:
+                wait = window.cooldown_until - time.monotonic()
+                if wait <= 0 and window.in_flight < int(window.limit):
+                    break
+                window.cond.wait(wait if wait > 0 else None)
+            window.in_flight += 1
+
+    def release(self, host, latency, status):
+        """
+        报告请求结果并归还许可
+        :param latency: 响应秒数
+        :param status: HTTP状态码，None表示超时或连接失败
+        """
+        window = self._window(host)
+        with window.cond:
+            window.in_flight -= 1
+            window.requests += 1
+            now = time.monotonic()
+            if is_throttled(status):
+                window.throttled += 1
+                # 同一批在途请求一起失败时只减一次
+                if now - window.last_decrease >= (window.latency or 0):
+                    window.limit = max(AIMD_MIN_LIMIT, window.limit * AIMD_DECREASE)
+                    window.last_decrease = now
+                    window.cooldown_until = now + min(AIMD_BACKOFF_BASE * 2 ** window.backoffs, AIMD_BACKOFF_MAX)
+                    window.backoffs += 1
+            else:
+                window.backoffs = 0
+                window.latency = latency if window.latency is None else window.latency * 0.8 + latency * 0.2
+                if window.baseline is None or latency < window.baseline:
+                    window.baseline = latency
+                else:
+                    window.baseline = window.baseline * 0.99 + latency * 0.01  # 基线缓慢跟随网络变化
+                # 窗口用满且延迟正常时才增加，空闲时上限不会虚涨
+                if (window.in_flight + 1 >= int(window.limit)
+                        and window.latency <= window.baseline * AIMD_LATENCY_TOLERANCE):
+                    window.limit = min(AIMD_MAX_LIMIT, window.limit + AIMD_INCREASE / window.limit)
+            window.cond.notify_all()
+
+    def stats(self):
+        """
+        :return: {主机: {limit, in_flight, latency, throttled}}
+        """
+        with self._lock:
+            items = list(self._windows.items())
+        return {host: window.to_dict() for host, window in items}
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import shutil
+import time
+from instock.core.stock_hist_store import stock_hist_store_path, etf_hist_store_path
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+cache_path = os.path.join(cpath_current, 'cache')
+legacy_hist_path = os.path.join(cache_path, 'hist')  # 旧版按月份/起始日期保存的历史数据，已不再读取
+
+cache_budget_mb = 2048  # 历史数据仓库占用磁盘上限
+cache_max_age_days = 30  # 超过该天数未访问的代码(退市、停牌)直接清理
+
+# 使用环境变量配置,docker -e 传递
+_cache_budget_mb = os.environ.get('cache_budget_mb')
+if _cache_budget_mb is not None:
+    cache_budget_mb = int(_cache_budget_mb)
+_cache_max_age_days = os.environ.get('cache_max_age_days')
+if _cache_max_age_days is not None:
+    cache_max_age_days = int(_cache_max_age_days)
+
+
+def _size_and_access(paths):
+    size = 0
+    access = 0
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for name in files:
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    size += st.st_size
+                    access = max(access, st.st_atime, st.st_mtime)
+        elif os.path.isfile(path):
+            st = os.stat(path)
+            size += st.st_size
+            access = max(access, st.st_atime, st.st_mtime)
+    return size, access
+
+
+def _remove(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.isfile(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# 缓存目录管理：按字节预算和最近访问时间清理。
+# 淘汰单位是一个缓存条目：历史数据仓库中一只代码的列文件目录及其json，或旧版缓存的一个起始日期目录。
+# 最近访问时间取条目内文件atime和mtime的最大值。noatime/relatime挂载时读取不会更新atime，
+# 仓库读取时用stock_hist_store.mark_access显式更新，因此按atime排序仍是真正的最近使用顺序。
+class cache_manager:
+    def __init__(self, budget_bytes=None, max_age_days=None, store_paths=None, legacy_path=None):
+        """
+        :param budget_bytes: 历史数据仓库(股票和ETF合计)占用上限，超出时按最近访问时间从旧到新淘汰
+        :param max_age_days: 超过该天数未访问的条目直接淘汰
+        """
+        self.budget_bytes = budget_bytes if budget_bytes is not None else cache_budget_mb * 1024 * 1024
+        self.max_age_days = max_age_days if max_age_days is not None else cache_max_age_days
+        self.store_paths = store_paths or (stock_hist_store_path, etf_hist_store_path)
+        self.legacy_path = legacy_path or legacy_hist_path
+
+    def _store_entries(self):
+        entries = []
+        for store_path in self.store_paths:
+            if not os.path.isdir(store_path):
+                continue
+            for adjust in os.listdir(store_path):
+                adjust_path = os.path.join(store_path, adjust)
+                if not os.path.isdir(adjust_path):
+                    continue
+                for name in os.listdir(adjust_path):
+                    path = os.path.join(adjust_path, name)
+                    if not os.path.isdir(path):
+                        continue
+                    paths = (path, os.path.join(adjust_path, f"{name}.json"))
+                    size, access = _size_and_access(paths)
+                    entries.append((access, size, paths))
+        return entries
+
+    def _legacy_entries(self):
+        entries = []
+        if not os.path.isdir(self.legacy_path):
+            return entries
+        for month in os.listdir(self.legacy_path):
+            month_path = os.path.join(self.legacy_path, month)
+            if not os.path.isdir(month_path):
+                continue
+            for date_start in os.listdir(month_path):
+                path = os.path.join(month_path, date_start)
+                size, access = _size_and_access((path,))
+                entries.append((access, size, (path,)))
+        return entries
+
+    def collect(self, dry_run=False):
+        """
+        执行清理
+        :param dry_run: 只统计不删除
+        :return: 统计信息字典
+        """
+        stats = {'legacy_entries': 0, 'expired_entries': 0, 'evicted_entries': 0,
+                 'reclaimed_bytes': 0, 'remaining_bytes': 0, 'remaining_entries': 0}
+
+        # 旧版缓存已不再读取，全部回收
+        for access, size, paths in self._legacy_entries():
+            stats['legacy_entries'] += 1
+            stats['reclaimed_bytes'] += size
+            if not dry_run:
+                _remove(paths)
+        if not dry_run and os.path.isdir(self.legacy_path):
+            for month in os.listdir(self.legacy_path):
+                month_path = os.path.join(self.legacy_path, month)
+                if os.path.isdir(month_path) and not os.listdir(month_path):
+                    os.rmdir(month_path)
+
+        entries = sorted(self._store_entries(), key=lambda x: x[0])
+        expire_before = time.time() - self.max_age_days * 86400
+        total = sum(x[1] for x in entries)
+        kept = 0
+        for access, size, paths in entries:
+            if access < expire_before:
+                stats['expired_entries'] += 1
+            elif total > self.budget_bytes:
+                stats['evicted_entries'] += 1
+            else:
+                kept += 1
+                continue
+            total -= size
+            stats['reclaimed_bytes'] += size
+            if not dry_run:
+                _remove(paths)
+        stats['remaining_bytes'] = total
+        stats['remaining_entries'] = kept
+        logging.info(f"cache_manager.collect：回收旧版缓存{stats['legacy_entries']}个，过期{stats['expired_entries']}个，"
+                     f"超预算淘汰{stats['evicted_entries']}个，共释放{stats['reclaimed_bytes'] / 1048576:.1f}MB，"
+                     f"剩余{stats['remaining_entries']}个{stats['remaining_bytes'] / 1048576:.1f}MB")
+        return stats
@@ -5,12 +5,10 @@ Date: 2023/1/4 12:18
 Desc: 东方财富-ETF 行情
 https://quote.eastmoney.com/sh513500.html
 """
-import random
-import time
 from functools import lru_cache
-import math
 import pandas as pd
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
+from instock.core.crawling.kline_em import kline_to_df
 
 __author__ = 'myh '
 __date__ = '2025/12/31 '
@@ -26,11 +24,7 @@ def fund_etf_spot_em() -> pd.DataFrame:
     :rtype: pandas.DataFrame
     """
     url = "http://88.push2.eastmoney.com/api/qt/clist/get"
-    page_size = 50
-    page_current = 1
     params = {
-        "pn": page_current,
-        "pz": page_size,
         "po": "1",
         "np": "1",
         "ut": "bd1d9ddb04089700cf9c27f6f7426281",
@@ -42,26 +36,10 @@ def fund_etf_spot_em() -> pd.DataFrame:
         "fields": "f1,f2,f3,f4,f5,f6,f7,f8,f9,f10,f12,f13,f14,f15,f16,f17,f18,f20,f21,f23,f24,f25,f22,f11,f62,f128,f136,f115,f152",
         "_": "1672806290972",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_pages(url, params)
     if not data:
         return pd.DataFrame()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df = pd.DataFrame(data)
     temp_df.rename(
         columns={
@@ -125,8 +103,6 @@ def _fund_etf_code_id_map_em() -> dict:
     """
     url = "http://88.push2.eastmoney.com/api/qt/clist/get"
     params = {
-        "pn": "1",
-        "pz": "5000",
         "po": "1",
         "np": "1",
         "ut": "bd1d9ddb04089700cf9c27f6f7426281",
@@ -138,12 +114,21 @@ def _fund_etf_code_id_map_em() -> dict:
         "fields": "f12,f13",
         "_": "1672806290972",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    temp_df = pd.DataFrame(data_json["data"]["diff"])
+    temp_df = pd.DataFrame(fetcher.fetch_pages(url, params))
+    if temp_df.empty:
+        return dict()
     temp_dict = dict(zip(temp_df["f12"], temp_df["f13"]))
     return temp_dict
 
+
+def _fund_etf_code_id_em(symbol: str) -> int:
+    # 查不到时按代码前缀推断：5开头上交所，1开头深交所
+    market_id = _fund_etf_code_id_map_em().get(symbol)
+    if market_id is None:
+        market_id = 1 if symbol.startswith("5") else 0
+    return market_id
+
+
 def fund_etf_hist_em(
     symbol: str = "159707",
     period: str = "daily",
@@ -167,7 +152,23 @@ def fund_etf_hist_em(
     :return: 每日行情
     :rtype: pandas.DataFrame
     """
-    code_id_dict = _fund_etf_code_id_map_em()
+    url, params = fund_etf_hist_request(symbol, period, start_date, end_date, adjust)
+    r =  fetcher.make_request(url, params=params)
+    return fund_etf_hist_parse(r.json())
+
+
+def fund_etf_hist_request(
+    symbol: str = "159707",
+    period: str = "daily",
+    start_date: str = "19700101",
+    end_date: str = "20500101",
+    adjust: str = "",
+) -> tuple:
+    """
+    东方财富-ETF 行情的请求地址和参数，供批量抓取复用
+    :return: (url, params)
+    :rtype: tuple
+    """
     adjust_dict = {"qfq": "1", "hfq": "2", "": "0"}
     period_dict = {"daily": "101", "weekly": "102", "monthly": "103"}
     url = "http://push2his.eastmoney.com/api/qt/stock/kline/get"
@@ -177,17 +178,25 @@ def fund_etf_hist_em(
         "ut": "7eea3edcaed734bea9cbfc24409ed989",
         "klt": period_dict[period],
         "fqt": adjust_dict[adjust],
-        "secid": f"{code_id_dict[symbol]}.{symbol}",
+        "secid": f"{_fund_etf_code_id_em(symbol)}.{symbol}",
         "beg": start_date,
         "end": end_date,
         "_": "1623766962675",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
+    return url, params
+
+
+def fund_etf_hist_parse(data_json: dict) -> pd.DataFrame:
+    """
+    东方财富-ETF 行情的返回数据解析
+    :param data_json: 接口返回的json
+    :type data_json: dict
+    :return: 每日行情
+    :rtype: pandas.DataFrame
+    """
     if not (data_json["data"] and data_json["data"]["klines"]):
         return pd.DataFrame()
-    temp_df = pd.DataFrame([item.split(",") for item in data_json["data"]["klines"]])
-    temp_df.columns = [
+    temp_df = kline_to_df(data_json["data"]["klines"], [
         "日期",
         "开盘",
         "收盘",
@@ -199,20 +208,7 @@ def fund_etf_hist_em(
         "涨跌幅",
         "涨跌额",
         "换手率",
-    ]
-    temp_df.index = pd.to_datetime(temp_df["日期"])
-    temp_df.reset_index(inplace=True, drop=True)
-
-    temp_df["开盘"] = pd.to_numeric(temp_df["开盘"])
-    temp_df["收盘"] = pd.to_numeric(temp_df["收盘"])
-    temp_df["最高"] = pd.to_numeric(temp_df["最高"])
-    temp_df["最低"] = pd.to_numeric(temp_df["最低"])
-    temp_df["成交量"] = pd.to_numeric(temp_df["成交量"])
-    temp_df["成交额"] = pd.to_numeric(temp_df["成交额"])
-    temp_df["振幅"] = pd.to_numeric(temp_df["振幅"])
-    temp_df["涨跌幅"] = pd.to_numeric(temp_df["涨跌幅"])
-    temp_df["涨跌额"] = pd.to_numeric(temp_df["涨跌额"])
-    temp_df["换手率"] = pd.to_numeric(temp_df["换手率"])
+    ])
     return temp_df
 
 
@@ -239,7 +235,6 @@ def fund_etf_hist_min_em(
     :return: 每日分时行情
     :rtype: pandas.DataFrame
     """
-    code_id_dict = _fund_etf_code_id_map_em()
     adjust_map = {
         "": "0",
         "qfq": "1",
@@ -253,7 +248,7 @@ def fund_etf_hist_min_em(
             "ut": "7eea3edcaed734bea9cbfc24409ed989",
             "ndays": "5",
             "iscr": "0",
-            "secid": f"{code_id_dict[symbol]}.{symbol}",
+            "secid": f"{_fund_etf_code_id_em(symbol)}.{symbol}",
             "_": "1623766962675",
         }
         r =  fetcher.make_request(url, params=params)
@@ -291,17 +286,14 @@ def fund_etf_hist_min_em(
             "ut": "7eea3edcaed734bea9cbfc24409ed989",
             "klt": period,
             "fqt": adjust_map[adjust],
-            "secid": f"{code_id_dict[symbol]}.{symbol}",
+            "secid": f"{_fund_etf_code_id_em(symbol)}.{symbol}",
             "beg": "0",
             "end": "20500000",
             "_": "1630930917857",
         }
         r =  fetcher.make_request(url, params=params)
         data_json = r.json()
-        temp_df = pd.DataFrame(
-            [item.split(",") for item in data_json["data"]["klines"]]
-        )
-        temp_df.columns = [
+        temp_df = kline_to_df(data_json["data"]["klines"], [
             "时间",
             "开盘",
             "收盘",
@@ -313,21 +305,11 @@ def fund_etf_hist_min_em(
             "涨跌幅",
             "涨跌额",
             "换手率",
-        ]
-        temp_df.index = pd.to_datetime(temp_df["时间"])
+        ], date_type="datetime64")
+        temp_df.index = temp_df["时间"]
         temp_df = temp_df[start_date:end_date]
         temp_df.reset_index(drop=True, inplace=True)
-        temp_df["开盘"] = pd.to_numeric(temp_df["开盘"])
-        temp_df["收盘"] = pd.to_numeric(temp_df["收盘"])
-        temp_df["最高"] = pd.to_numeric(temp_df["最高"])
-        temp_df["最低"] = pd.to_numeric(temp_df["最低"])
-        temp_df["成交量"] = pd.to_numeric(temp_df["成交量"])
-        temp_df["成交额"] = pd.to_numeric(temp_df["成交额"])
-        temp_df["振幅"] = pd.to_numeric(temp_df["振幅"])
-        temp_df["涨跌幅"] = pd.to_numeric(temp_df["涨跌幅"])
-        temp_df["涨跌额"] = pd.to_numeric(temp_df["涨跌额"])
-        temp_df["换手率"] = pd.to_numeric(temp_df["换手率"])
-        temp_df["时间"] = pd.to_datetime(temp_df["时间"]).astype(str)
+        temp_df["时间"] = temp_df["时间"].astype(str)
         temp_df = temp_df[
             [
                 "时间",
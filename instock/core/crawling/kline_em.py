@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+Date: 2026/10/17 09:00
+Desc: 东方财富网-K线接口返回数据解析，日K、分钟K、ETF K线共用
+"""
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+
+def kline_to_df(klines: list, columns: list, date_type: str = "str") -> pd.DataFrame:
+    """
+    把K线字符串列表("日期,开盘,收盘,...")一次解析成有类型的列
+    整体拼成一段文本交给C解析器，数值列直接得到float64，不经过object列再逐列转换
+    :param klines: 接口返回的klines
+    :type klines: list
+    :param columns: 列名，第一列为日期或时间
+    :type columns: list
+    :param date_type: 日期列类型，choice of {"str": "原样字符串", "datetime64": "datetime64", "int": "int32的yyyymmdd"}
+    :type date_type: str
+    :return: K线数据
+    :rtype: pandas.DataFrame
+    """
+    if not klines:
+        return pd.DataFrame(columns=columns)
+    date_column = columns[0]
+    dtype = {c: np.float64 for c in columns[1:]}
+    dtype[date_column] = str
+    temp_df = pd.read_csv(
+        StringIO("\n".join(klines)),
+        header=None,
+        names=columns,
+        usecols=range(len(columns)),
+        dtype=dtype,
+        na_values=["-"],
+        keep_default_na=False,
+    )
+    if date_type == "datetime64":
+        temp_df[date_column] = pd.to_datetime(temp_df[date_column])
+    elif date_type == "int":
+        dates = temp_df[date_column].str.slice(0, 10).str.replace("-", "", regex=False)
+        temp_df[date_column] = dates.astype(np.int32)
+    return temp_df
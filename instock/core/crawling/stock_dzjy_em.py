@@ -5,9 +5,6 @@ Date: 2022/5/16 15:31
 Desc: 东方财富网-数据中心-大宗交易-市场统计
 http://data.eastmoney.com/dzjy/dzjy_sctj.aspx
 """
-import random
-import time
-
 import pandas as pd
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
 
@@ -28,25 +25,12 @@ def stock_dzjy_sctj() -> pd.DataFrame:
     params = {
         'sortColumns': 'TRADE_DATE',
         'sortTypes': '-1',
-        'pageSize': '500',
-        'pageNumber': '1',
         'reportName': 'PRT_BLOCKTRADE_MARKET_STA',
         'columns': 'TRADE_DATE,SZ_INDEX,SZ_CHANGE_RATE,BLOCKTRADE_DEAL_AMT,PREMIUM_DEAL_AMT,PREMIUM_RATIO,DISCOUNT_DEAL_AMT,DISCOUNT_RATIO',
         'source': 'WEB',
         'client': 'WEB',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = int(data_json['result']["pages"])
-    big_df = pd.DataFrame()
-    for page in range(1, total_page+1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({'pageNumber': page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json['result']["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_pages(url, params, style='datacenter', page_size=500))
 
     big_df.reset_index(inplace=True)
     big_df['index'] = big_df['index'] + 1
@@ -289,26 +273,13 @@ def stock_dzjy_hygtj(symbol: str = '近三月') -> pd.DataFrame:
     params = {
         'sortColumns': 'DEAL_NUM,SECURITY_CODE',
         'sortTypes': '-1,-1',
-        'pageSize': '5000',
-        'pageNumber': '1',
         'reportName': 'RPT_BLOCKTRADE_ACSTA',
         'columns': 'SECURITY_CODE,SECUCODE,SECURITY_NAME_ABBR,CLOSE_PRICE,CHANGE_RATE,TRADE_DATE,DEAL_AMT,PREMIUM_RATIO,SUM_TURNOVERRATE,DEAL_NUM,PREMIUM_TIMES,DISCOUNT_TIMES,D1_AVG_ADJCHRATE,D5_AVG_ADJCHRATE,D10_AVG_ADJCHRATE,D20_AVG_ADJCHRATE,DATE_TYPE_CODE',
         'source': 'WEB',
         'client': 'WEB',
         'filter': f'(DATE_TYPE_CODE={period_map[symbol]})',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json['result']["pages"]
-    big_df = pd.DataFrame()
-    for page in range(1, int(total_page)+1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json['result']["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_pages(url, params, style='datacenter', page_size=5000))
 
     big_df.reset_index(inplace=True)
     big_df['index'] = big_df.index + 1
@@ -386,26 +357,13 @@ def stock_dzjy_hyyybtj(symbol: str = '近3日') -> pd.DataFrame:
     params = {
         'sortColumns': 'BUYER_NUM,TOTAL_BUYAMT',
         'sortTypes': '-1,-1',
-        'pageSize': '5000',
-        'pageNumber': '1',
         'reportName': 'RPT_BLOCKTRADE_OPERATEDEPTSTATISTICS',
         'columns': 'OPERATEDEPT_CODE,OPERATEDEPT_NAME,ONLIST_DATE,STOCK_DETAILS,BUYER_NUM,SELLER_NUM,TOTAL_BUYAMT,TOTAL_SELLAMT,TOTAL_NETAMT,N_DATE',
         'source': 'WEB',
         'client': 'WEB',
         'filter': f'(N_DATE=-{period_map[symbol]})',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json['result']["pages"]
-    big_df = pd.DataFrame()
-    for page in range(1, int(total_page)+1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json['result']["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_pages(url, params, style='datacenter', page_size=5000))
 
     big_df.reset_index(inplace=True)
     big_df['index'] = big_df.index + 1
@@ -461,26 +419,13 @@ def stock_dzjy_yybph(symbol: str = '近三月') -> pd.DataFrame:
     params = {
         'sortColumns': 'D5_BUYER_NUM,D1_AVERAGE_INCREASE',
         'sortTypes': '-1,-1',
-        'pageSize': '5000',
-        'pageNumber': '1',
         'reportName': 'RPT_BLOCKTRADE_OPERATEDEPT_RANK',
         'columns': 'OPERATEDEPT_CODE,OPERATEDEPT_NAME,D1_BUYER_NUM,D1_AVERAGE_INCREASE,D1_RISE_PROBABILITY,D5_BUYER_NUM,D5_AVERAGE_INCREASE,D5_RISE_PROBABILITY,D10_BUYER_NUM,D10_AVERAGE_INCREASE,D10_RISE_PROBABILITY,D20_BUYER_NUM,D20_AVERAGE_INCREASE,D20_RISE_PROBABILITY,N_DATE,RELATED_ORG_CODE',
         'source': 'WEB',
         'client': 'WEB',
         'filter': f'(N_DATE=-{period_map[symbol]})',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json['result']["pages"]
-    big_df = pd.DataFrame()
-    for page in range(1, int(total_page)+1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json['result']["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_pages(url, params, style='datacenter', page_size=5000))
 
     big_df.reset_index(inplace=True)
     big_df['index'] = big_df.index + 1
@@ -6,9 +6,7 @@ Desc: 东方财富网-数据中心-资金流向
 https://data.eastmoney.com/zjlx/detail.html
 """
 import json
-import random
 import time
-import math
 import pandas as pd
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
 
@@ -18,6 +16,11 @@ __date__ = '2025/12/31 '
 # 创建全局实例，供所有函数使用
 fetcher = eastmoney_fetcher()
 
+
+def _jsonp_loads(r):
+    text_data = r.text
+    return json.loads(text_data[text_data.find("{"): -2])
+
 def stock_individual_fund_flow_rank(indicator: str = "5日") -> pd.DataFrame:
     """
     东方财富网-数据中心-资金流向-排名
@@ -46,13 +49,9 @@ def stock_individual_fund_flow_rank(indicator: str = "5日") -> pd.DataFrame:
         ],
     }
     url = "http://push2.eastmoney.com/api/qt/clist/get"
-    page_size = 50
-    page_current = 1
     params = {
         "fid": indicator_map[indicator][0],
         "po": "1",
-        "pz": page_size,
-        "pn": page_current,
         "np": "1",
         "fltt": "2",
         "invt": "2",
@@ -60,21 +59,7 @@ def stock_individual_fund_flow_rank(indicator: str = "5日") -> pd.DataFrame:
         "fs": "m:0+t:6+f:!2,m:0+t:13+f:!2,m:0+t:80+f:!2,m:1+t:2+f:!2,m:1+t:23+f:!2,m:0+t:7+f:!2,m:1+t:3+f:!2",
         "fields": indicator_map[indicator][1],
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
+    data = fetcher.fetch_pages(url, params)
 
     temp_df = pd.DataFrame(data)
     temp_df = temp_df[~temp_df["f2"].isin(["-"])]
@@ -270,11 +255,7 @@ def stock_sector_fund_flow_rank(
         ],
     }
     url = "http://push2.eastmoney.com/api/qt/clist/get"
-    page_size = 50
-    page_current = 1
     params = {
-        "pn": page_current,
-        "pz": page_size,
         "po": "1",
         "np": "1",
         "ut": "b2884a393a59ad64002292a3e90d46a5",
@@ -288,24 +269,7 @@ def stock_sector_fund_flow_rank(
         "cb": "jQuery18308357908311220152_1589256588824",
         "_": int(time.time() * 1000),
     }
-    r = fetcher.make_request(url, params=params)
-    text_data = r.text
-    data_json = json.loads(text_data[text_data.find("{") : -2])
-    data = data_json["data"]["diff"]
-
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r = fetcher.make_request(url, params=params)
-        text_data = r.text
-        json_data = json.loads(text_data[text_data.find("{"): -2])
-        _data = json_data["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
+    data = fetcher.fetch_pages(url, params, parse=_jsonp_loads)
 
     temp_df = pd.DataFrame(data)
 
@@ -4,13 +4,14 @@
 Date: 2022/6/19 15:26
 Desc: 东方财富网-行情首页-沪深京 A 股
 """
-import random
+import json
+import logging
+import os
+import threading
 import time
-
 import pandas as pd
-import math
-from functools import lru_cache
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
+from instock.core.crawling.kline_em import kline_to_df
 
 __author__ = 'myh '
 __date__ = '2025/12/31 '
@@ -18,6 +19,18 @@ __date__ = '2025/12/31 '
 # 创建全局实例，供所有函数使用
 fetcher = eastmoney_fetcher()
 
+# 股票和市场代码对应关系保存到本地，过期后在后台刷新
+cpath_current = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+code_id_map_file = os.path.join(cpath_current, 'cache', 'code_id_map.json')
+CODE_ID_MAP_TTL = 7 * 24 * 3600
+CODE_ID_MAP_RETRY = 3600  # 刷新失败后至少间隔多少秒再刷新，期间继续使用本地保存的对应关系
+
+_code_id_map = None
+_code_id_map_time = 0
+_code_id_map_retry_at = 0
+_code_id_map_lock = threading.Lock()
+_code_id_map_refreshing = False
+
 def stock_zh_a_spot_em() -> pd.DataFrame:
     """
     东方财富网-沪深京 A 股-实时行情
@@ -26,11 +39,7 @@ def stock_zh_a_spot_em() -> pd.DataFrame:
     :rtype: pandas.DataFrame
     """
     url = "http://82.push2.eastmoney.com/api/qt/clist/get"
-    page_size = 50
-    page_current = 1
     params = {
-        "pn": page_current,
-        "pz": page_size,
         "po": "1",
         "np": "1",
         "ut": "bd1d9ddb04089700cf9c27f6f7426281",
@@ -41,25 +50,10 @@ def stock_zh_a_spot_em() -> pd.DataFrame:
         "fields": "f2,f3,f4,f5,f6,f7,f8,f9,f10,f11,f12,f14,f15,f16,f17,f18,f20,f21,f22,f23,f24,f25,f26,f37,f38,f39,f40,f41,f45,f46,f48,f49,f57,f61,f100,f112,f113,f114,f115,f221",
         "_": "1623833739532",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_pages(url, params)
     if not data:
         return pd.DataFrame()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df = pd.DataFrame(data)
     temp_df.columns = [
         "最新价",
@@ -188,7 +182,6 @@ def stock_zh_a_spot_em() -> pd.DataFrame:
     return temp_df
 
 
-@lru_cache()
 def code_id_map_em() -> dict:
     """
     东方财富-股票和市场代码
@@ -197,11 +190,7 @@ def code_id_map_em() -> dict:
     :rtype: dict
     """
     url = "http://80.push2.eastmoney.com/api/qt/clist/get"
-    page_size = 50
-    page_current = 1
     params = {
-        "pn": page_current,
-        "pz": page_size,
         "po": "1",
         "np": "1",
         "ut": "bd1d9ddb04089700cf9c27f6f7426281",
@@ -212,33 +201,15 @@ def code_id_map_em() -> dict:
         "fields": "f12",
         "_": "1623833739532",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_pages(url, params)
     if not data:
         return dict()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df = pd.DataFrame(data)
     temp_df["market_id"] = 1
     temp_df.columns = ["sh_code", "sh_id"]
     code_id_dict = dict(zip(temp_df["sh_code"], temp_df["sh_id"]))
-    page_current = 1
     params = {
-        "pn": page_current,
-        "pz": page_size,
         "po": "1",
         "np": "1",
         "ut": "bd1d9ddb04089700cf9c27f6f7426281",
@@ -249,32 +220,14 @@ def code_id_map_em() -> dict:
         "fields": "f12",
         "_": "1623833739532",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_pages(url, params)
     if not data:
         return dict()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df_sz = pd.DataFrame(data)
     temp_df_sz["sz_id"] = 0
     code_id_dict.update(dict(zip(temp_df_sz["f12"], temp_df_sz["sz_id"])))
-    page_current = 1
     params = {
-        "pn": page_current,
-        "pz": page_size,
         "po": "1",
         "np": "1",
         "ut": "bd1d9ddb04089700cf9c27f6f7426281",
@@ -285,31 +238,93 @@ def code_id_map_em() -> dict:
         "fields": "f12",
         "_": "1623833739532",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_pages(url, params)
     if not data:
         return dict()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df_sz = pd.DataFrame(data)
     temp_df_sz["bj_id"] = 0
     code_id_dict.update(dict(zip(temp_df_sz["f12"], temp_df_sz["bj_id"])))
     return code_id_dict
 
 
+def _code_id_prefix(symbol: str) -> int:
+    """
+    按代码前缀推断市场代码：6开头上证A股、5开头上证基金、900开头上证B股为1，
+    深证(0、2、3开头)和北证(4、8、920开头)为0
+    """
+    if symbol.startswith(("6", "5", "900")):
+        return 1
+    return 0
+
+
+def _save_code_id_map(code_id_dict: dict):
+    path = os.path.dirname(code_id_map_file)
+    if not os.path.exists(path):
+        os.makedirs(path, exist_ok=True)
+    tmp_file = f"{code_id_map_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump({"time": time.time(), "map": code_id_dict}, f)
+    os.replace(tmp_file, code_id_map_file)
+
+
+def _refresh_code_id_map():
+    global _code_id_map, _code_id_map_time, _code_id_map_refreshing
+    try:
+        code_id_dict = code_id_map_em()
+        if code_id_dict:
+            code_id_dict = {k: int(v) for k, v in code_id_dict.items()}
+            _save_code_id_map(code_id_dict)
+            with _code_id_map_lock:
+                _code_id_map = code_id_dict
+                _code_id_map_time = time.time()
+        else:
+            logging.warning(f"stock_hist_em._refresh_code_id_map刷新为空，{CODE_ID_MAP_RETRY}秒后重试")
+    except Exception as e:
+        logging.error(f"stock_hist_em._refresh_code_id_map处理异常：{e}")
+    finally:
+        _code_id_map_refreshing = False
+
+
+def _load_code_id_map() -> dict:
+    global _code_id_map, _code_id_map_time, _code_id_map_refreshing, _code_id_map_retry_at
+    with _code_id_map_lock:
+        if _code_id_map is None:
+            _code_id_map = {}
+            try:
+                with open(code_id_map_file, "r") as f:
+                    saved = json.load(f)
+                _code_id_map = saved["map"]
+                _code_id_map_time = saved["time"]
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.error(f"stock_hist_em._load_code_id_map处理异常：{e}")
+        # 过期或没有本地文件时后台刷新，期间使用旧数据和前缀推断，不阻塞请求
+        # 无论刷新成功与否都记录尝试时间，接口故障时不会每次调用都重新刷新
+        now = time.time()
+        if now - _code_id_map_time > CODE_ID_MAP_TTL and not _code_id_map_refreshing and now >= _code_id_map_retry_at:
+            _code_id_map_refreshing = True
+            _code_id_map_retry_at = now + CODE_ID_MAP_RETRY
+            threading.Thread(target=_refresh_code_id_map, name="code_id_map_refresh", daemon=True).start()
+        return _code_id_map
+
+
+def code_id_em(symbol: str) -> int:
+    """
+    东方财富-股票的市场代码
+    先查本地保存的对应关系，查不到时按代码前缀推断，不需要访问网络
+    :param symbol: 股票代码
+    :type symbol: str
+    :return: 市场代码
+    :rtype: int
+    """
+    market_id = _load_code_id_map().get(symbol)
+    if market_id is None:
+        market_id = _code_id_prefix(symbol)
+    return market_id
+
+
 def stock_zh_a_hist(
     symbol: str = "000001",
     period: str = "daily",
@@ -333,7 +348,23 @@ def stock_zh_a_hist(
     :return: 每日行情
     :rtype: pandas.DataFrame
     """
-    code_id_dict = code_id_map_em()
+    url, params = stock_zh_a_hist_request(symbol, period, start_date, end_date, adjust)
+    r =  fetcher.make_request(url, params=params)
+    return stock_zh_a_hist_parse(r.json())
+
+
+def stock_zh_a_hist_request(
+    symbol: str = "000001",
+    period: str = "daily",
+    start_date: str = "19700101",
+    end_date: str = "20500101",
+    adjust: str = "",
+) -> tuple:
+    """
+    东方财富网-沪深京 A 股-每日行情的请求地址和参数，供批量抓取复用
+    :return: (url, params)
+    :rtype: tuple
+    """
     adjust_dict = {"qfq": "1", "hfq": "2", "": "0"}
     period_dict = {"daily": "101", "weekly": "102", "monthly": "103"}
     url = "http://push2his.eastmoney.com/api/qt/stock/kline/get"
@@ -343,19 +374,25 @@ def stock_zh_a_hist(
         "ut": "7eea3edcaed734bea9cbfc24409ed989",
         "klt": period_dict[period],
         "fqt": adjust_dict[adjust],
-        "secid": f"{code_id_dict[symbol]}.{symbol}",
+        "secid": f"{code_id_em(symbol)}.{symbol}",
         "beg": start_date,
         "end": end_date,
         "_": "1623766962675",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
+    return url, params
+
+
+def stock_zh_a_hist_parse(data_json: dict) -> pd.DataFrame:
+    """
+    东方财富网-沪深京 A 股-每日行情的返回数据解析
+    :param data_json: 接口返回的json
+    :type data_json: dict
+    :return: 每日行情
+    :rtype: pandas.DataFrame
+    """
     if not (data_json["data"] and data_json["data"]["klines"]):
         return pd.DataFrame()
-    temp_df = pd.DataFrame(
-        [item.split(",") for item in data_json["data"]["klines"]]
-    )
-    temp_df.columns = [
+    temp_df = kline_to_df(data_json["data"]["klines"], [
         "日期",
         "开盘",
         "收盘",
@@ -367,20 +404,7 @@ def stock_zh_a_hist(
         "涨跌幅",
         "涨跌额",
         "换手率",
-    ]
-    temp_df.index = pd.to_datetime(temp_df["日期"])
-    temp_df.reset_index(inplace=True, drop=True)
-
-    temp_df["开盘"] = pd.to_numeric(temp_df["开盘"])
-    temp_df["收盘"] = pd.to_numeric(temp_df["收盘"])
-    temp_df["最高"] = pd.to_numeric(temp_df["最高"])
-    temp_df["最低"] = pd.to_numeric(temp_df["最低"])
-    temp_df["成交量"] = pd.to_numeric(temp_df["成交量"])
-    temp_df["成交额"] = pd.to_numeric(temp_df["成交额"])
-    temp_df["振幅"] = pd.to_numeric(temp_df["振幅"])
-    temp_df["涨跌幅"] = pd.to_numeric(temp_df["涨跌幅"])
-    temp_df["涨跌额"] = pd.to_numeric(temp_df["涨跌额"])
-    temp_df["换手率"] = pd.to_numeric(temp_df["换手率"])
+    ])
 
     return temp_df
 
@@ -408,7 +432,6 @@ def stock_zh_a_hist_min_em(
     :return: 每日分时行情
     :rtype: pandas.DataFrame
     """
-    code_id_dict = code_id_map_em()
     adjust_map = {
         "": "0",
         "qfq": "1",
@@ -422,7 +445,7 @@ def stock_zh_a_hist_min_em(
             "ut": "7eea3edcaed734bea9cbfc24409ed989",
             "ndays": "5",
             "iscr": "0",
-            "secid": f"{code_id_dict[symbol]}.{symbol}",
+            "secid": f"{code_id_em(symbol)}.{symbol}",
             "_": "1623766962675",
         }
         r =  fetcher.make_request(url, params=params)
@@ -460,17 +483,14 @@ def stock_zh_a_hist_min_em(
             "ut": "7eea3edcaed734bea9cbfc24409ed989",
             "klt": period,
             "fqt": adjust_map[adjust],
-            "secid": f"{code_id_dict[symbol]}.{symbol}",
+            "secid": f"{code_id_em(symbol)}.{symbol}",
             "beg": "0",
             "end": "20500000",
             "_": "1630930917857",
         }
         r =  fetcher.make_request(url, params=params)
         data_json = r.json()
-        temp_df = pd.DataFrame(
-            [item.split(",") for item in data_json["data"]["klines"]]
-        )
-        temp_df.columns = [
+        temp_df = kline_to_df(data_json["data"]["klines"], [
             "时间",
             "开盘",
             "收盘",
@@ -482,21 +502,11 @@ def stock_zh_a_hist_min_em(
             "涨跌幅",
             "涨跌额",
             "换手率",
-        ]
-        temp_df.index = pd.to_datetime(temp_df["时间"])
+        ], date_type="datetime64")
+        temp_df.index = temp_df["时间"]
         temp_df = temp_df[start_date:end_date]
         temp_df.reset_index(drop=True, inplace=True)
-        temp_df["开盘"] = pd.to_numeric(temp_df["开盘"])
-        temp_df["收盘"] = pd.to_numeric(temp_df["收盘"])
-        temp_df["最高"] = pd.to_numeric(temp_df["最高"])
-        temp_df["最低"] = pd.to_numeric(temp_df["最低"])
-        temp_df["成交量"] = pd.to_numeric(temp_df["成交量"])
-        temp_df["成交额"] = pd.to_numeric(temp_df["成交额"])
-        temp_df["振幅"] = pd.to_numeric(temp_df["振幅"])
-        temp_df["涨跌幅"] = pd.to_numeric(temp_df["涨跌幅"])
-        temp_df["涨跌额"] = pd.to_numeric(temp_df["涨跌额"])
-        temp_df["换手率"] = pd.to_numeric(temp_df["换手率"])
-        temp_df["时间"] = pd.to_datetime(temp_df["时间"]).astype(str)
+        temp_df["时间"] = temp_df["时间"].astype(str)
         temp_df = temp_df[
             [
                 "时间",
@@ -532,7 +542,6 @@ def stock_zh_a_hist_pre_min_em(
     :return: 每日分时行情包含盘前数据
     :rtype: pandas.DataFrame
     """
-    code_id_dict = code_id_map_em()
     url = "https://push2.eastmoney.com/api/qt/stock/trends2/get"
     params = {
         "fields1": "f1,f2,f3,f4,f5,f6,f7,f8,f9,f10,f11,f12,f13",
@@ -541,7 +550,7 @@ def stock_zh_a_hist_pre_min_em(
         "ndays": "1",
         "iscr": "1",
         "iscca": "0",
-        "secid": f"{code_id_dict[symbol]}.{symbol}",
+        "secid": f"{code_id_em(symbol)}.{symbol}",
         "_": "1623766962675",
     }
     r =  fetcher.make_request(url, params=params)
@@ -5,11 +5,7 @@ Date: 2022/3/15 17:32
 Desc: 东方财富网-数据中心-龙虎榜单
 https://data.eastmoney.com/stock/tradedetail.html
 """
-import random
-import time
-
 import pandas as pd
-from tqdm import tqdm
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
 
 __author__ = 'myh '
@@ -37,30 +33,16 @@ def stock_lhb_detail_em(
     params = {
         "sortColumns": "SECURITY_CODE,TRADE_DATE",
         "sortTypes": "1,-1",
-        "pageSize": "5000",
-        "pageNumber": "1",
         "reportName": "RPT_DAILYBILLBOARD_DETAILSNEW",
         "columns": "SECURITY_CODE,SECUCODE,SECURITY_NAME_ABBR,TRADE_DATE,EXPLAIN,CLOSE_PRICE,CHANGE_RATE,BILLBOARD_NET_AMT,BILLBOARD_BUY_AMT,BILLBOARD_SELL_AMT,BILLBOARD_DEAL_AMT,ACCUM_AMOUNT,DEAL_NET_RATIO,DEAL_AMOUNT_RATIO,TURNOVERRATE,FREE_MARKET_CAP,EXPLANATION,D1_CLOSE_ADJCHRATE,D2_CLOSE_ADJCHRATE,D5_CLOSE_ADJCHRATE,D10_CLOSE_ADJCHRATE,SECURITY_TYPE_CODE",
         "source": "WEB",
         "client": "WEB",
         "filter": f"(TRADE_DATE<='{end_date}')(TRADE_DATE>='{start_date}')",
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page_num = data_json["result"]["pages"]
-    big_df = pd.DataFrame()
-    for page in range(1, total_page_num + 1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update(
-            {
-                "pageNumber": page,
-            }
-        )
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json["result"]["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    data = fetcher.fetch_pages(url, params, style='datacenter', page_size=5000)
+    if not data:
+        return pd.DataFrame()
+    big_df = pd.DataFrame(data)
 
     big_df.reset_index(inplace=True)
     big_df["index"] = big_df.index + 1
@@ -242,17 +224,16 @@ def stock_lhb_jgmmtj_em(
     params = {
         "sortColumns": "NET_BUY_AMT,TRADE_DATE,SECURITY_CODE",
         "sortTypes": "-1,-1,1",
-        "pageSize": "5000",
-        "pageNumber": "1",
         "reportName": "RPT_ORGANIZATION_TRADE_DETAILS",
         "columns": "ALL",
         "source": "WEB",
         "client": "WEB",
         "filter": f"(TRADE_DATE>='{start_date}')(TRADE_DATE<='{end_date}')",
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    temp_df = pd.DataFrame(data_json["result"]["data"])
+    data = fetcher.fetch_pages(url, params, style='datacenter', page_size=5000)
+    if not data:
+        return pd.DataFrame()
+    temp_df = pd.DataFrame(data)
     temp_df.reset_index(inplace=True)
     temp_df["index"] = temp_df.index + 1
     temp_df.columns = [
@@ -338,26 +319,13 @@ def stock_lhb_jgstatistic_em(symbol: str = "近一月") -> pd.DataFrame:
     params = {
         "sortColumns": "ONLIST_TIMES,SECURITY_CODE",
         "sortTypes": "-1,1",
-        "pageSize": "5000",
-        "pageNumber": "1",
         "reportName": "RPT_ORGANIZATION_SEATNEW",
         "columns": "ALL",
         "source": "WEB",
         "client": "WEB",
         "filter": f'(STATISTICSCYCLE="{symbol_map[symbol]}")',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json["result"]["pages"]
-    big_df = pd.DataFrame()
-    for page in tqdm(range(1, total_page + 1), leave=False):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json["result"]["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_pages(url, params, style='datacenter', page_size=5000))
 
     big_df.reset_index(inplace=True)
     big_df["index"] = big_df.index + 1
@@ -438,27 +406,13 @@ def stock_lhb_hyyyb_em(
     params = {
         "sortColumns": "TOTAL_NETAMT,ONLIST_DATE,OPERATEDEPT_CODE",
         "sortTypes": "-1,-1,1",
-        "pageSize": "5000",
-        "pageNumber": "1",
         "reportName": "RPT_OPERATEDEPT_ACTIVE",
         "columns": "ALL",
         "source": "WEB",
         "client": "WEB",
         "filter": f"(ONLIST_DATE>='{start_date}')(ONLIST_DATE<='{end_date}')",
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json["result"]["pages"]
-
-    big_df = pd.DataFrame()
-    for page in tqdm(range(1, total_page + 1), leave=False):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json["result"]["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_pages(url, params, style='datacenter', page_size=5000))
 
     big_df.reset_index(inplace=True)
     big_df["index"] = big_df.index + 1
@@ -519,26 +473,13 @@ def stock_lhb_yybph_em(symbol: str = "近一月") -> pd.DataFrame:
     params = {
         "sortColumns": "TOTAL_BUYER_SALESTIMES_1DAY,OPERATEDEPT_CODE",
         "sortTypes": "-1,1",
-        "pageSize": "5000",
-        "pageNumber": "1",
         "reportName": "RPT_RATEDEPT_RETURNT_RANKING",
         "columns": "ALL",
         "source": "WEB",
         "client": "WEB",
         "filter": f'(STATISTICSCYCLE="{symbol_map[symbol]}")',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json["result"]["pages"]
-    big_df = pd.DataFrame()
-    for page in tqdm(range(1, total_page + 1), leave=False):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json["result"]["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_pages(url, params, style='datacenter', page_size=5000))
 
     big_df.reset_index(inplace=True)
     big_df["index"] = big_df.index + 1
@@ -627,26 +568,13 @@ def stock_lhb_traderstatistic_em(symbol: str = "近一月") -> pd.DataFrame:
     params = {
         "sortColumns": "AMOUNT,OPERATEDEPT_CODE",
         "sortTypes": "-1,1",
-        "pageSize": "5000",
-        "pageNumber": "1",
         "reportName": "RPT_OPERATEDEPT_LIST_STATISTICS",
         "columns": "ALL",
         "source": "WEB",
         "client": "WEB",
         "filter": f'(STATISTICSCYCLE="{symbol_map[symbol]}")',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json["result"]["pages"]
-    big_df = pd.DataFrame()
-    for page in tqdm(range(1, total_page + 1), leave=False):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json["result"]["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_pages(url, params, style='datacenter', page_size=5000))
 
     big_df.reset_index(inplace=True)
     big_df["index"] = big_df.index + 1
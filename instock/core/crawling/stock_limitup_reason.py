@@ -7,7 +7,7 @@ http://zx.10jqka.com.cn/event/api/getharden/date/2025-02-21/orderby/date/orderwa
 """
 
 import pandas as pd
-import requests
+import instock.core.http_replay as hrp
 import re
 import numpy as np
 from instock.core.singleton_proxy import proxys
@@ -26,7 +26,7 @@ def stock_limitup_reason(date: str = "2025-02-27") -> pd.DataFrame:
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/81.0.4044.138 Safari/537.36 Thx"
     }
-    r = requests.get(url, proxies = proxys().get_proxies(), headers=headers)
+    r = hrp.get(url, proxies = proxys().get_proxies(), headers=headers)
     data_json = r.json()
 
     data = data_json["data"]
@@ -100,7 +100,7 @@ def stock_limitup_detail(row):
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36"
     }
-    r = requests.get(url, proxies = proxys().get_proxies(), headers=headers)
+    r = hrp.get(url, proxies = proxys().get_proxies(), headers=headers)
     data_text = r.text
 
     # match_title = re.search(r"var title = '(.*?)';", data_text)
@@ -1,9 +1,6 @@
 # -*- coding:utf-8 -*-
 # !/usr/bin/env python
 
-import math
-import random
-import time
 import pandas as pd
 import instock.core.tablestructure as tbs
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
@@ -14,61 +11,45 @@ __date__ = '2025/12/31 '
 # 创建全局实例，供所有函数使用
 fetcher = eastmoney_fetcher()
 
-def stock_selection() -> pd.DataFrame:
+def stock_selection(columns=None) -> pd.DataFrame:
     """
     东方财富网-个股-选股器
     https://data.eastmoney.com/xuangu/
-    :return: 选股器
+    :param columns: 需要的字段(TABLE_CN_STOCK_SELECTION的字段名)，默认全部，只请求这些字段
+    :type columns: list
+    :return: 选股器，列为字段名
     :rtype: pandas.DataFrame
     """
     cols = tbs.TABLE_CN_STOCK_SELECTION['columns']
-    page_size = 50
-    page_current = 1
-    sty = ""  # 初始值 "SECUCODE,SECURITY_CODE,SECURITY_NAME_ABBR,CHANGE_RATE"
-    for k in cols:
-        sty = f"{sty},{cols[k]['map']}"
+    if columns is None:
+        columns = list(cols)
+    maps = [cols[k]['map'] for k in columns]
     url = "https://data.eastmoney.com/dataapi/xuangu/list"
     params = {
-        "sty": sty[1:],
+        "sty": ",".join(maps),
         "filter": "(MARKET+in+(\"上交所主板\",\"深交所主板\",\"深交所创业板\"))(NEW_PRICE>0)",
-        "p": page_current,
-        "ps": page_size,
         "source": "SELECT_SECURITIES",
         "client": "WEB"
     }
 
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["result"]["data"]
+    data = fetcher.fetch_pages(url, params, style='xuangu')
     if not data:
         return pd.DataFrame()
 
-    data_count = data_json["result"]["count"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["p"] = page_current
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["result"]["data"]
-        data.extend(_data)
-        page_count =page_count - 1
-
-    temp_df = pd.DataFrame(data)
+    temp_df = pd.DataFrame(data).reindex(columns=maps)
+    temp_df.columns = list(columns)
 
-    mask = ~temp_df['CONCEPT'].isna()
-    temp_df.loc[mask, 'CONCEPT'] = temp_df.loc[mask, 'CONCEPT'].apply(lambda x: ', '.join(x))
-    mask = ~temp_df['STYLE'].isna()
-    temp_df.loc[mask, 'STYLE'] = temp_df.loc[mask, 'STYLE'].apply(lambda x: ', '.join(x))
+    for k in ('concept', 'style'):
+        if k in temp_df.columns:
+            mask = ~temp_df[k].isna()
+            temp_df.loc[mask, k] = temp_df.loc[mask, k].apply(lambda x: ', '.join(x))
 
-    for k in cols:
+    for k in columns:
         t = tbs.get_field_type_name(cols[k]["type"])
         if t == 'numeric':
-            temp_df[cols[k]["map"]] = pd.to_numeric(temp_df[cols[k]["map"]], errors="coerce")
+            temp_df[k] = pd.to_numeric(temp_df[k], errors="coerce")
         elif t == 'datetime':
-            temp_df[cols[k]["map"]] = pd.to_datetime(temp_df[cols[k]["map"]], errors="coerce").dt.date
+            temp_df[k] = pd.to_datetime(temp_df[k], errors="coerce").dt.date
 
     return temp_df
 
@@ -8,8 +8,7 @@ https://finance.sina.com.cn/realstock/company/klc_td_sh.txt
 """
 import datetime
 import pandas as pd
-import requests
-from py_mini_racer import MiniRacer
+import instock.core.http_replay as hrp
 from instock.core.singleton_proxy import proxys
 
 hk_js_decode = """
@@ -311,7 +310,8 @@ def tool_trade_date_hist_sina() -> pd.DataFrame:
     :rtype: pandas.DataFrame
     """
     url = "https://finance.sina.com.cn/realstock/company/klc_td_sh.txt"
-    r = requests.get(url, proxies = proxys().get_proxies())
+    r = hrp.get(url, proxies = proxys().get_proxies())
+    from py_mini_racer import MiniRacer  # JS运行时导入较慢，只在需要解码时导入
     js_code = MiniRacer()
     js_code.eval(hk_js_decode)
     dict_list = js_code.call(
@@ -2,17 +2,38 @@
 # -*- coding: utf-8 -*-
 
 import os
+import logging
+import math
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from pathlib import Path
 import time
-import random
+from concurrent.futures import ThreadPoolExecutor
 from instock.core.singleton_proxy import proxys
+from instock.core.http_client import http_client
+from instock.core.fetch_metrics import fetch_metrics
+import instock.core.http_replay as hrp
 
 __author__ = 'myh '
 __date__ = '2025/12/31 '
 
+# 分页接口样式：(页码参数, 每页数量参数, 数据路径, 总数路径, 总数是否为总页数)
+PAGE_STYLES = {
+    'clist': ('pn', 'pz', ('data', 'diff'), ('data', 'total'), False),  # push2行情列表
+    'datacenter': ('pageNumber', 'pageSize', ('result', 'data'), ('result', 'pages'), True),  # 数据中心
+    'xuangu': ('p', 'ps', ('result', 'data'), ('result', 'count'), False),  # 选股器
+}
+PAGE_SIZE_MAX = 5000  # 请求的每页数量，服务器有上限时按第一页实际返回的数量计算
+PAGE_CONCURRENCY = 8  # 分页的线程数上限，实际在途请求数由http_client的aimd_controller按主机控制
+
+
+def _json_path(data_json, path):
+    for key in path:
+        if data_json is None:
+            return None
+        data_json = data_json.get(key)
+    return data_json
+
+
 class eastmoney_fetcher:
     """
     东方财富网数据获取器
@@ -22,8 +43,10 @@ class eastmoney_fetcher:
     def __init__(self):
         """初始化获取器"""
         self.base_dir = os.path.dirname(os.path.dirname(__file__))
-        self.session = self._create_session()
-        self.proxies = proxys().get_proxies()
+        self.client = http_client()
+        self.headers = self._create_headers()
+        self.cookies = {'Cookie': self._get_cookie()}
+        self.proxy_pool = proxys()
 
     def _get_cookie(self):
         """
@@ -48,29 +71,9 @@ class eastmoney_fetcher:
         # 3. 默认Cookie（可能过期，仅作为备选）
         return 'st_si=78948464251292; st_psi=20260205091253851-119144370567-1089607836; st_pvi=07789985376191; st_sp=2026-02-05%2009%3A11%3A13; st_inirUrl=https%3A%2F%2Fxuangu.eastmoney.com%2FResult; st_sn=12; st_asi=20260205091253851-119144370567-1089607836-webznxg.dbssk.qxg-1'
 
-    def _create_session(self):
-        """创建并配置会话"""
-        session = requests.Session()
-
-        # 配置连接池
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=0.1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "POST", "OPTIONS"]
-        )
-        adapter = HTTPAdapter(
-            max_retries=retry_strategy,
-            pool_connections=50,  # 增加连接池大小
-            pool_maxsize=50  # 增加连接池最大大小
-        )
-
-        # 为http和https请求添加适配器
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-
-        # 设置请求头
-        headers = {
+    def _create_headers(self):
+        """创建请求头，会话和连接池由进程内共享的http_client管理"""
+        return {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Referer': 'https://quote.eastmoney.com/',
             'Accept': '*/*',
@@ -78,37 +81,39 @@ class eastmoney_fetcher:
             'Accept-Encoding': 'gzip, deflate, br, zstd',
             'Connection': 'keep-alive',
         }
-        session.headers.update(headers)
-        # 设置Cookie
-        session.cookies.update({'Cookie': self._get_cookie()})
-        return session
 
-    def make_request(self, url, params=None, retry=3, timeout=10):
+    def make_request(self, url, params=None, retry=3, timeout=10, cache=True):
         """
         发送请求
         :param url: 请求URL
         :param params: 请求参数
         :param retry: 重试次数
         :param timeout: 超时时间
+        :param cache: 是否经过运行期响应缓存
         :return: 响应对象
         """
         for i in range(retry):
+            proxies = self.proxy_pool.get_proxies()  # 每次请求轮换代理
+            start = time.monotonic()
             try:
-                response = self.session.get(
+                response = hrp.send('GET', url, lambda: self.client.get(
                     url,
-                    proxies=self.proxies,
+                    headers=self.headers,
+                    cookies=self.cookies,
+                    proxies=proxies,
                     params=params,
                     timeout=timeout
-                )
+                ), params=params, cache=cache)
                 response.raise_for_status()  # 检查HTTP错误
+                self.proxy_pool.report(proxies, True, time.monotonic() - start)
                 return response
             except requests.exceptions.RequestException as e:
-                print(f"请求错误: {e}, 第 {i + 1}/{retry} 次重试")
-                if i < retry - 1:
-                    # 随机延迟后重试
-                    time.sleep(random.uniform(1, 3))
-                else:
+                self.proxy_pool.report(proxies, False)
+                logging.warning(f"eastmoney_fetcher请求错误：{url} {e}，第 {i + 1}/{retry} 次")
+                # 重试的等待由aimd_controller决定：被限流时主机暂停发送，下次取得许可后再发
+                if i >= retry - 1:
                     raise
+                fetch_metrics().retry(url)
 
     def make_post_request(self, url, data=None, json=None, params=None, retry=3, timeout=60):
         """
@@ -122,28 +127,79 @@ class eastmoney_fetcher:
         :return: 响应对象
         """
         for i in range(retry):
+            proxies = self.proxy_pool.get_proxies()  # 每次请求轮换代理
+            start = time.monotonic()
             try:
-                response = self.session.post(
+                response = hrp.send('POST', url, lambda: self.client.post(
                     url,
-                    proxies=self.proxies,
+                    headers=self.headers,
+                    cookies=self.cookies,
+                    proxies=proxies,
                     params=params,
                     data=data,
                     json=json,
                     timeout=timeout
-                )
+                ), params=params, data=data, json_data=json)
                 response.raise_for_status()  # 检查HTTP错误
+                self.proxy_pool.report(proxies, True, time.monotonic() - start)
                 return response
             except requests.exceptions.RequestException as e:
-                print(f"请求错误: {e}, 第 {i + 1}/{retry} 次重试")
-                if i < retry - 1:
-                    # 随机延迟后重试
-                    time.sleep(random.uniform(1, 3))
-                else:
+                self.proxy_pool.report(proxies, False)
+                logging.warning(f"eastmoney_fetcher请求错误：{url} {e}，第 {i + 1}/{retry} 次")
+                # 重试的等待由aimd_controller决定：被限流时主机暂停发送，下次取得许可后再发
+                if i >= retry - 1:
                     raise
+                fetch_metrics().retry(url)
 
     def update_cookie(self, new_cookie):
         """
         更新Cookie
         :param new_cookie: 新的Cookie值
         """
-        self.session.cookies.update({'Cookie': new_cookie})
+        self.cookies = {'Cookie': new_cookie}
+
+    def _fetch_page(self, url, params, parse):
+        r = self.make_request(url, params=params)
+        return r.json() if parse is None else parse(r)
+
+    def fetch_pages(self, url, params, style='clist', page_size=PAGE_SIZE_MAX, parse=None):
+        """
+        获取分页接口的全部数据
+        先请求第一页得到总数，并按实际返回数量确定服务器接受的最大每页数量，其余页并发获取。
+        :param url: 请求URL
+        :param params: 请求参数，页码和每页数量由本方法设置
+        :param style: 分页样式，见PAGE_STYLES
+        :param page_size: 请求的每页数量
+        :param parse: 响应解析函数，默认按json解析(JSONP等接口需要传入)
+        :return: 按页顺序合并的全部行，调用方一次构造DataFrame
+        """
+        page_key, size_key, data_path, total_path, total_is_pages = PAGE_STYLES[style]
+        params = dict(params)
+        params[page_key] = 1
+        params[size_key] = page_size
+        data_json = self._fetch_page(url, params, parse)
+        data = _json_path(data_json, data_path)
+        if not data:
+            return []
+        if isinstance(data, dict):
+            data = list(data.values())
+        total = int(_json_path(data_json, total_path) or 0)
+        if total_is_pages:
+            page_count = total
+        else:
+            if len(data) < page_size and len(data) < total:
+                page_size = len(data)  # 服务器限制了每页数量
+                params[size_key] = page_size
+            page_count = math.ceil(total / page_size)
+        if page_count <= 1:
+            return data
+
+        pages = [data]
+        with ThreadPoolExecutor(max_workers=min(PAGE_CONCURRENCY, page_count - 1)) as executor:
+            futures = [executor.submit(self._fetch_page, url, dict(params, **{page_key: page}), parse)
+                       for page in range(2, page_count + 1)]
+            for future in futures:
+                _data = _json_path(future.result(), data_path)
+                if _data:
+                    pages.append(list(_data.values()) if isinstance(_data, dict) else _data)
+        return [row for page in pages for row in page]
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import json
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+from instock.lib.singleton_type import singleton_type
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+fetch_metrics_file = os.path.join(cpath_current, 'log', 'fetch_metrics.json')
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10)  # 延迟直方图的桶上界(秒)，最后一个桶为超过10秒
+
+
+def endpoint(url):
+    """
+    接口标识：主机+路径，不含参数
+    """
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+# 单个接口的统计
+class endpoint_stats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency = 0.0  # 累计响应秒数
+        self.latency_max = 0.0
+        self.sleep = 0.0  # 等待并发许可、被限流暂停、回放延迟的累计秒数
+        self.statuses = {}
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def _percentile(self, p):
+        # 按直方图估计，返回所在桶的上界
+        if self.requests == 0:
+            return 0.0
+        target = self.requests * p
+        count = 0
+        for i, n in enumerate(self.histogram):
+            count += n
+            if count >= target:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.latency_max
+        return self.latency_max
+
+    def to_dict(self):
+        labels = [f"<={b}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'latency_total': round(self.latency, 3),
+            'latency_avg': round(self.latency / self.requests, 4) if self.requests else 0.0,
+            'latency_max': round(self.latency_max, 4),
+            'latency_p50': self._percentile(0.5),
+            'latency_p95': self._percentile(0.95),
+            'sleep_total': round(self.sleep, 3),
+            'statuses': dict(self.statuses),
+            'latency_histogram': dict(zip(labels, self.histogram)),
+        }
+
+
+# 按接口的抓取统计，进程内共享。
+# http_client记录每个请求的状态码、延迟、流量和等待许可的时间，获取器记录重试次数。
+class fetch_metrics(metaclass=singleton_type):
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.started = datetime.datetime.now()
+
+    def _get(self, url):
+        key = endpoint(url)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = endpoint_stats()
+        return stats
+
+    def record(self, url, status, latency, size=0, sleep=0.0):
+        """
+        :param status: HTTP状态码，请求异常时为异常类名
+        """
+        with self._lock:
+            stats = self._get(url)
+            stats.requests += 1
+            if not isinstance(status, int) or status >= 400:
+                stats.errors += 1
+            stats.statuses[str(status)] = stats.statuses.get(str(status), 0) + 1
+            stats.bytes += size
+            stats.latency += latency
+            stats.latency_max = max(stats.latency_max, latency)
+            stats.sleep += sleep
+            i = 0
+            while i < len(LATENCY_BUCKETS) and latency > LATENCY_BUCKETS[i]:
+                i += 1
+            stats.histogram[i] += 1
+
+    def retry(self, url):
+        with self._lock:
+            self._get(url).retries += 1
+
+    def sleep(self, url, seconds):
+        with self._lock:
+            self._get(url).sleep += seconds
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self.started = datetime.datetime.now()
+
+    def snapshot(self):
+        """
+        :return: {'started', 'endpoints': {接口: 统计}}，接口按累计延迟从大到小排列
+        """
+        with self._lock:
+            items = [(k, v.to_dict()) for k, v in self._stats.items()]
+            started = self.started
+        items.sort(key=lambda x: -(x[1]['latency_total'] + x[1]['sleep_total']))
+        return {'started': started.strftime("%Y-%m-%d %H:%M:%S"), 'endpoints': dict(items)}
+
+    def save(self, filename=fetch_metrics_file):
+        """
+        保存本次运行的统计，web服务的/instock/metrics读取
+        """
+        data = self.snapshot()
+        data['finished'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            path = os.path.dirname(filename)
+            if not os.path.exists(path):
+                os.makedirs(path, exist_ok=True)
+            tmp_file = f"{filename}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_file, filename)
+        except Exception as e:
+            logging.error(f"fetch_metrics.save处理异常：{e}")
+        return data
+
+    @staticmethod
+    def load(filename=fetch_metrics_file):
+        try:
+            with open(filename, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"fetch_metrics.load处理异常：{e}")
+        return None
+
+    def log_summary(self, top=10):
+        endpoints = self.snapshot()['endpoints']
+        for key, data in list(endpoints.items())[:top]:
+            logging.info(f"fetch_metrics：{key} 请求{data['requests']}次，失败{data['errors']}次，"
+                         f"重试{data['retries']}次，累计延迟{data['latency_total']}秒"
+                         f"(p50≤{data['latency_p50']}秒，p95≤{data['latency_p95']}秒)，"
+                         f"等待{data['sleep_total']}秒，流量{data['bytes'] / 1048576:.2f}MB，状态码{data['statuses']}")
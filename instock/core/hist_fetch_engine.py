@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from instock.core.aimd_controller import AIMD_MAX_LIMIT, aimd_controller, host_key
+from instock.core.fetch_metrics import fetch_metrics
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+HIST_FETCH_CONCURRENCY = AIMD_MAX_LIMIT  # 在途请求数上限，实际并发由http_client的aimd_controller按主机调整
+PERMIT_POLL_SECONDS = 0.05  # 许可被其它爬虫占用时，事件循环重新检查的间隔
+
+_END = object()
+
+
+# 事件循环中的许可等待。
+# 先从aimd_controller不阻塞地取得主机许可，再把请求交给线程池，线程池中的线程只在请求进行中被占用，
+# 线程数随主机当前的AIMD上限变化，不会有线程阻塞在许可上。
+class _permit_gate:
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.queue = asyncio.Lock()
+        self.cond = asyncio.Condition()
+
+    async def acquire(self, host):
+        controller = aimd_controller()
+        # 按先后排队，只有队首检查许可，其余请求不被唤醒
+        async with self.queue, self.cond:
+            while True:
+                wait = None
+                if self.in_flight < self.concurrency:
+                    wait = controller.try_acquire(host)
+                    if wait == 0:
+                        self.in_flight += 1
+                        return
+                # 本引擎的请求完成时被唤醒；许可被其它爬虫占用或主机暂停时定时重新检查
+                try:
+                    await asyncio.wait_for(self.cond.wait(), wait or PERMIT_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self):
+        async with self.cond:
+            self.in_flight -= 1
+            self.cond.notify()
+
+
+# 基于asyncio的历史数据抓取引擎。
+# 请求从aimd_controller取得许可，所有爬虫按主机共享并发上限；许可在事件循环中取得，线程不等待许可。
+# 每返回一个结果就立即交给调用方处理，不必等全部抓完。
+class hist_fetch_engine:
+    def __init__(self, fetcher, concurrency=HIST_FETCH_CONCURRENCY, retry=3, timeout=10):
+        """
+        :param fetcher: eastmoney_fetcher实例，负责会话、Cookie和代理
+        :param concurrency: 在途请求数上限
+        :param retry: 重试次数
+        :param timeout: 超时时间
+        """
+        self.fetcher = fetcher
+        self.concurrency = max(int(concurrency), 1)
+        self.retry = retry
+        self.timeout = timeout
+
+    def _get(self, host, url, params):
+        # 许可已在事件循环中取得，登记到当前线程，http_client不再等待
+        controller = aimd_controller()
+        controller.hold(host)
+        try:
+            # 只请求一次，重试由引擎在事件循环中处理；每只代码只请求一次，不进运行期缓存
+            return self.fetcher.make_request(url, params=params, retry=1, timeout=self.timeout, cache=False).json()
+        finally:
+            controller.unhold()
+
+    async def _fetch(self, url, params, gate, executor):
+        loop = asyncio.get_running_loop()
+        host = host_key(url)
+        for i in range(self.retry):
+            await gate.acquire(host)
+            try:
+                return await loop.run_in_executor(executor, self._get, host, url, params)
+            except Exception:
+                # 被限流时aimd_controller会暂停该主机，重试在取得许可后发出
+                if i >= self.retry - 1:
+                    raise
+                fetch_metrics().retry(url)
+            finally:
+                await gate.release()
+
+    async def _worker(self, key, url, params, gate, executor, out):
+        try:
+            data_json = await self._fetch(url, params, gate, executor)
+        except Exception as e:
+            logging.error(f"hist_fetch_engine._worker处理异常：{key}{e}")
+            data_json = None
+        out.put((key, data_json))
+
+    async def _run(self, tasks, out):
+        gate = _permit_gate(self.concurrency)
+        # 只有取得许可的请求才提交到线程池，线程按需创建，数量跟随主机当前的AIMD上限，concurrency只是上界
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            await asyncio.gather(*(self._worker(key, url, params, gate, executor, out)
+                                   for key, url, params in tasks))
+
+    def iter_fetch(self, tasks, parse=None):
+        """
+        并发抓取，按完成顺序逐个返回
+        :param tasks: [(key, url, params), ...]
+        :param parse: 解析函数，参数为接口返回的json，在调用方线程中执行
+        :return: 生成器，元素为(key, 结果)，失败的请求不返回
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return
+        out = queue.Queue()
+
+        def run():
+            try:
+                asyncio.run(self._run(tasks, out))
+            except Exception as e:
+                logging.error(f"hist_fetch_engine.iter_fetch处理异常：{e}")
+            finally:
+                out.put(_END)
+
+        threading.Thread(target=run, name='hist_fetch_engine', daemon=True).start()
+        while True:
+            item = out.get()
+            if item is _END:
+                break
+            key, data_json = item
+            if data_json is None:
+                continue
+            if parse is None:
+                yield key, data_json
+                continue
+            try:
+                result = parse(data_json)
+            except Exception as e:
+                logging.error(f"hist_fetch_engine.iter_fetch解析异常：{key}{e}")
+                continue
+            yield key, result
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from instock.core.aimd_controller import aimd_controller, host_key
+from instock.core.fetch_metrics import fetch_metrics
+from instock.lib.singleton_type import singleton_type
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+HTTP_POOL_MAXSIZE = 50  # 每个主机保持的长连接数
+
+
+# 单个主机的请求统计
+class host_stats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = 0.0  # 累计响应秒数
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'latency_avg': round(self.latency / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+# 进程内共享的HTTP客户端。
+# 每个主机一个会话和连接池，所有爬虫模块共用，长连接在模块之间复用；
+# 记录每个主机的请求数、新建连接数(握手次数)、连接复用数、流量和平均延迟。
+# 每个请求都从aimd_controller取得主机的并发许可，重试由调用方进行，不在连接适配器中隐式重试。
+class http_client(metaclass=singleton_type):
+    def __init__(self):
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.controller = aimd_controller()
+        self.metrics = fetch_metrics()
+
+    @staticmethod
+    def _host(url):
+        return host_key(url)
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(max_retries=0, pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def session(self, url):
+        """
+        取得url所在主机的会话
+        """
+        host = self._host(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._sessions[host] = self._create_session()
+                self._stats[host] = host_stats()
+        return session
+
+    def request(self, method, url, **kwargs):
+        session = self.session(url)
+        host = self._host(url)
+        stats = self._stats[host]
+        wait_start = time.monotonic()
+        self.controller.acquire(host)
+        start = time.monotonic()
+        try:
+            response = session.request(method, url, **kwargs)
+            size = len(response.content)
+        except Exception as e:
+            latency = time.monotonic() - start
+            self.controller.release(host, latency, None)
+            self.metrics.record(url, type(e).__name__, latency, 0, start - wait_start)
+            with self._lock:
+                stats.requests += 1
+                stats.errors += 1
+                stats.latency += latency
+            raise
+        latency = time.monotonic() - start
+        self.controller.release(host, latency, response.status_code)
+        self.metrics.record(url, response.status_code, latency, size, start - wait_start)
+        with self._lock:
+            stats.requests += 1
+            stats.errors += 0 if response.ok else 1
+            stats.bytes += size
+            stats.latency += latency
+        return response
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request('POST', url, data=data, json=json, **kwargs)
+
+    @staticmethod
+    def _pool_counts(session):
+        # urllib3连接池记录了新建连接数和请求数，两者之差就是复用次数
+        connections = 0
+        pool_requests = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    pool_requests += pool.num_requests
+        return connections, pool_requests
+
+    def stats(self):
+        """
+        :return: {主机: {requests, errors, bytes, latency_avg, connections, reused, limit, throttled}}
+        """
+        with self._lock:
+            items = [(host, self._sessions[host], self._stats[host]) for host in self._sessions]
+        controls = self.controller.stats()
+        result = {}
+        for host, session, stats in items:
+            data = stats.to_dict()
+            connections, pool_requests = self._pool_counts(session)
+            data['connections'] = connections
+            data['reused'] = max(pool_requests - connections, 0)
+            control = controls.get(host, {})
+            data['limit'] = control.get('limit')
+            data['throttled'] = control.get('throttled', 0)
+            result[host] = data
+        return result
+
+    def log_stats(self):
+        for host, data in self.stats().items():
+            logging.info(f"http_client：{host} 请求{data['requests']}次，失败{data['errors']}次，"
+                         f"新建连接{data['connections']}个，复用{data['reused']}次，"
+                         f"流量{data['bytes'] / 1048576:.2f}MB，平均延迟{data['latency_avg']}秒，"
+                         f"被限流{data['throttled']}次，最终并发上限{data['limit']}")
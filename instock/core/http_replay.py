@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from instock.core.fetch_metrics import fetch_metrics
+from instock.core.http_client import http_client
+from instock.core.request_cache import request_cache, request_key
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+# HTTP录制/回放，用于离线运行作业和性能测试。
+# record：正常请求，同时把响应保存到本地；replay：不访问网络，从本地读取响应，可模拟网络延迟。
+# 使用环境变量配置,docker -e 传递
+#   http_replay_mode=record|replay
+#   http_fixture_path=录制文件目录，默认cache/fixtures
+#   http_replay_latency=回放时每个请求的延迟(毫秒)
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+http_fixture_path = os.environ.get('http_fixture_path') or os.path.join(cpath_current, 'cache', 'fixtures')
+http_replay_mode = (os.environ.get('http_replay_mode') or '').lower()
+http_replay_latency = float(os.environ.get('http_replay_latency') or 0) / 1000
+
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+_write_lock = threading.Lock()
+
+
+def set_mode(mode, fixture_path=None, latency=None):
+    """
+    运行时切换模式
+    :param mode: None/''、'record'或'replay'
+    :param latency: 回放延迟(秒)
+    """
+    global http_replay_mode, http_fixture_path, http_replay_latency
+    http_replay_mode = (mode or '').lower()
+    if fixture_path is not None:
+        http_fixture_path = fixture_path
+    if latency is not None:
+        http_replay_latency = latency
+
+
+def _fixture_file(method, url, params=None, data=None, json_data=None):
+    key = request_key(method, url, params, data, json_data)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    host = urlsplit(url).netloc.replace(':', '_') or 'local'
+    return os.path.join(http_fixture_path, host, f"{digest}.json")
+
+
+def _save(fixture_file, method, url, response):
+    record = {
+        'method': method,
+        'url': url,
+        'status': response.status_code,
+        'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+        'encoding': response.encoding,
+        'content': base64.b64encode(response.content).decode('ascii'),
+    }
+    path = os.path.dirname(fixture_file)
+    with _write_lock:
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        tmp_file = f"{fixture_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_file, fixture_file)
+
+
+def _load(fixture_file, url):
+    try:
+        with open(fixture_file, 'r') as f:
+            record = json.load(f)
+    except FileNotFoundError:
+        raise requests.exceptions.ConnectionError(f"http_replay没有录制该请求：{url}")
+    if http_replay_latency > 0:
+        time.sleep(http_replay_latency)
+        fetch_metrics().sleep(url, http_replay_latency)
+    response = requests.models.Response()
+    response.status_code = record['status']
+    response.headers.update(record['headers'])
+    response.encoding = record['encoding']
+    response.url = record['url']
+    response._content = base64.b64decode(record['content'])
+    return response
+
+
+def send(method, url, send_func, params=None, data=None, json_data=None, cache=True):
+    """
+    按当前模式发送请求，相同的请求经request_cache合并，运行期内只访问一次网络
+    :param send_func: 实际发送请求的函数，无参数，返回requests响应
+    :param cache: 为False时不合并也不缓存，用于只请求一次的大响应(历史日K)
+    """
+    if not cache:
+        return _send(method, url, send_func, params, data, json_data)
+    return request_cache().fetch(request_key(method, url, params, data, json_data),
+                                 lambda: _send(method, url, send_func, params, data, json_data))
+
+
+def _send(method, url, send_func, params=None, data=None, json_data=None):
+    if not http_replay_mode:
+        return send_func()
+    fixture_file = _fixture_file(method, url, params, data, json_data)
+    if http_replay_mode == MODE_REPLAY:
+        return _load(fixture_file, url)
+    response = send_func()
+    if http_replay_mode == MODE_RECORD and response.ok:
+        try:
+            _save(fixture_file, method, url, response)
+        except Exception as e:
+            logging.error(f"http_replay.send处理异常：{e}")
+    return response
+
+
+def get(url, params=None, **kwargs):
+    """
+    替代requests.get，通过共享的http_client发送
+    """
+    return send('GET', url, lambda: http_client().get(url, params=params, **kwargs), params=params)
+
+
+def post(url, data=None, json=None, **kwargs):
+    """
+    替代requests.post，通过共享的http_client发送
+    """
+    return send('POST', url, lambda: http_client().post(url, data=data, json=json, **kwargs), data=data, json_data=json)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import logging
+import os
+import threading
+import pandas as pd
+import instock.lib.trade_time as trd
+from instock.core.stock_hist_store import mark_access
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+# 设置基础目录，每次加载使用。
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+lhb_store_path = os.path.join(cpath_current, 'cache', 'lhb_store')
+
+LHB_PUBLISH_TIME = datetime.time(20, 0, 0)  # 龙虎榜和机构买卖数据在收盘后数小时才发布完整，之后保存的分区才算最终数据
+
+
+# 按交易日分区的龙虎榜数据仓库。
+# 每个交易日一个文件，只向接口请求还没有保存的交易日，滚动窗口的统计直接读本地数据。
+# 按分区文件的保存时间判断是否需要重新抓取：
+# 在该交易日发布截止时间之前保存的分区可能为空或不完整，一直重新抓取直到截止时间之后保存过一次；
+# 上榜后N日涨跌幅等字段会在上榜后继续更新，最近mutable_days个交易日的分区在最近一次发布之前保存的也重新抓取。
+class lhb_store:
+    _lock = threading.Lock()
+
+    def __init__(self, name, fetch_func, date_column, mutable_days=0, root=None):
+        """
+        :param name: 数据名称，作为目录名
+        :param fetch_func: 抓取函数，参数为(开始日期YYYYMMDD, 结束日期YYYYMMDD)，返回DataFrame
+        :param date_column: 上榜日期列名，值为datetime.date
+        :param mutable_days: 上榜后仍会更新的交易日数
+        """
+        self.fetch_func = fetch_func
+        self.date_column = date_column
+        self.mutable_days = mutable_days
+        self.root = os.path.join(root or lhb_store_path, name)
+        if not os.path.exists(self.root):
+            os.makedirs(self.root, exist_ok=True)
+
+    def _file(self, date):
+        return os.path.join(self.root, f"{date.strftime('%Y%m%d')}.gzip.pickle")
+
+    def _read(self, date):
+        try:
+            # 只更新访问时间，修改时间用于判断上榜后N日字段是否需要重新抓取
+            mark_access(self._file(date))
+            return pd.read_pickle(self._file(date), compression="gzip")
+        except Exception as e:
+            logging.error(f"lhb_store._read处理异常：{date}{e}")
+        return None
+
+    def _write(self, date, data):
+        filename = self._file(date)
+        tmp_file = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data.to_pickle(tmp_file, compression="gzip")
+        os.replace(tmp_file, filename)
+
+    @staticmethod
+    def _published(date):
+        return datetime.datetime.combine(date, LHB_PUBLISH_TIME).timestamp()
+
+    @staticmethod
+    def _last_published():
+        # 最近一个已过发布截止时间的交易日
+        now = datetime.datetime.now()
+        date = now.date()
+        if not trd.is_trade_date(date) or now.time() < LHB_PUBLISH_TIME:
+            date = trd.get_previous_trade_date(date)
+        return date
+
+    def _missing(self, dates):
+        if self.mutable_days > 0:
+            cutoff = trd.get_previous_trade_date(datetime.date.today(), self.mutable_days)
+            settled = lhb_store._published(lhb_store._last_published())
+        else:
+            cutoff = None
+            settled = None
+        missing = []
+        for date in dates:
+            filename = self._file(date)
+            if not os.path.isfile(filename):
+                missing.append(date)
+                continue
+            mtime = os.path.getmtime(filename)
+            if mtime < lhb_store._published(date):
+                missing.append(date)  # 发布完成之前保存的
+            elif cutoff is not None and date > cutoff and mtime < settled:
+                missing.append(date)  # 上榜后N日字段在保存之后又更新过
+        return missing
+
+    def _update(self, dates):
+        start = min(dates)
+        end = max(dates)
+        data = self.fetch_func(start.strftime("%Y%m%d"), end.strftime("%Y%m%d"))
+        if data is None:
+            return
+        groups = {} if len(data.index) == 0 else dict(list(data.groupby(self.date_column, sort=False)))
+        published = max(groups) if groups else None
+        empty = data.iloc[0:0]
+        for date in dates:
+            part = groups.get(date)
+            if part is not None:
+                self._write(date, part.reset_index(drop=True))
+            elif published is not None and date < published:
+                # 之后的交易日已有数据，这天确实没有上榜记录
+                self._write(date, empty)
+
+    def load(self, start, end):
+        """
+        读取[start, end]区间内的数据，缺少的交易日一次请求补齐
+        :param start: 开始日期，datetime.date
+        :param end: 结束日期，datetime.date
+        :return: DataFrame，没有数据时返回None
+        """
+        dates = trd.get_trade_dates(start, end)
+        if not dates:
+            # 没有交易日历时直接请求接口
+            return self.fetch_func(start.strftime("%Y%m%d"), end.strftime("%Y%m%d"))
+        with lhb_store._lock:
+            missing = self._missing(dates)
+            if missing:
+                self._update(missing)
+        parts = []
+        for date in dates:
+            if os.path.isfile(self._file(date)):
+                part = self._read(date)
+                if part is not None and len(part.index) > 0:
+                    parts.append(part)
+        if not parts:
+            return None
+        return pd.concat(parts, ignore_index=True)
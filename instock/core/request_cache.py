@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from instock.lib.singleton_type import singleton_type
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+REQUEST_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 一次运行内缓存的响应总大小上限
+
+# 每次请求都会变化的参数(时间戳)，不参与匹配
+VOLATILE_PARAMS = {'_'}
+
+
+def request_key(method, url, params=None, data=None, json_data=None):
+    """
+    请求的规范化键：参数排序，去掉时间戳参数
+    """
+    if isinstance(params, dict):
+        params = sorted((k, str(v)) for k, v in params.items() if k not in VOLATILE_PARAMS)
+    return json.dumps([method.upper(), url, params, data, json_data], ensure_ascii=False, sort_keys=True,
+                      default=str)
+
+
+# 进行中的请求
+class _flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+
+
+# 请求合并和运行期响应缓存。
+# 相同的请求(URL和规范化参数)同时发出时只有第一个访问网络，其余等待并共用结果(single-flight)；
+# 在run()范围内成功的响应保存下来，之后的相同请求直接返回，范围结束时清空。
+class request_cache(metaclass=singleton_type):
+    def __init__(self, max_bytes=REQUEST_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._responses = {}
+        self._inflight = {}
+        self._bytes = 0
+        self._scopes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @contextmanager
+    def run(self):
+        """
+        一次作业运行的缓存范围，可以嵌套
+        """
+        with self._lock:
+            self._scopes += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._scopes -= 1
+                if self._scopes == 0:
+                    logging.info(f"request_cache：缓存命中{self.hits}次，合并并发请求{self.coalesced}次，"
+                                 f"访问网络{self.misses}次，缓存{len(self._responses)}个响应"
+                                 f"{self._bytes / 1048576:.2f}MB")
+                    self._responses.clear()
+                    self._bytes = 0
+                    self.hits = self.coalesced = self.misses = 0
+
+    def fetch(self, key, send_func):
+        """
+        :param key: request_key生成的键
+        :param send_func: 实际发送请求的函数，无参数，返回requests响应
+        """
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self.hits += 1
+                return response
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+
+        try:
+            flight.response = send_func()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                response = flight.response
+                if self._scopes > 0 and response is not None and response.ok:
+                    size = len(response.content)
+                    if self._bytes + size <= self.max_bytes:
+                        self._responses[key] = response
+                        self._bytes += size
+            flight.event.set()
+        return flight.response
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import logging
 import os.path
 import sys
 import random
+import threading
+import time
 from instock.lib.singleton_type import singleton_type
 
 # 在项目运行时，临时将项目路径添加到环境变量
@@ -16,25 +19,91 @@ __author__ = 'myh '
 __date__ = '2025/1/6 '
 
 
+PROXY_FAIL_EJECT = 3  # 连续失败次数达到后暂停使用
+PROXY_COOLDOWN = 60  # 首次暂停秒数，再次被暂停时加倍
+PROXY_COOLDOWN_MAX = 600
+PROXY_EWMA = 0.3  # 延迟和错误率的指数平均系数
+
+
+# 单个代理的健康状态
+class proxy_health:
+    def __init__(self):
+        self.latency = 1.0  # 平均响应秒数，未使用过的代理按1秒估计
+        self.error_rate = 0.0
+        self.failures = 0  # 连续失败次数
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def score(self):
+        # 越小越好：错误率高的代理相当于更慢
+        return self.latency * (1 + 4 * self.error_rate)
+
+
 # 读取代理
+# 每次请求轮换代理，记录每个代理的延迟和错误率，连续失败的代理暂停使用一段时间，优先选择又快又稳定的代理。
 class proxys(metaclass=singleton_type):
     def __init__(self):
+        self.data = []
         try:
             with open(proxy_filename, "r") as file:
                 self.data = list(set(line.strip() for line in file.readlines() if line.strip()))
         except Exception:
            pass
+        self._health = {proxy: proxy_health() for proxy in self.data}
+        self._lock = threading.Lock()
 
     def get_data(self):
         return self.data
 
+    def _choose(self):
+        now = time.monotonic()
+        healthy = [p for p in self.data if self._health[p].ejected_until <= now]
+        if not healthy:
+            # 全部暂停时使用最早恢复的代理
+            return min(self.data, key=lambda p: self._health[p].ejected_until)
+        if len(healthy) == 1:
+            return healthy[0]
+        # 随机取两个选较好的，既偏向快的代理又不会把请求都压到同一个代理上
+        a, b = random.sample(healthy, 2)
+        return a if self._health[a].score() <= self._health[b].score() else b
+
     def get_proxies(self):
         if self.data is None or len(self.data)==0:
             return None
 
-        proxy = random.choice(self.data)
+        with self._lock:
+            proxy = self._choose()
         return {"http": proxy, "https": proxy}
 
+    def report(self, proxies, ok, latency=None):
+        """
+        报告一次请求的结果
+        :param proxies: get_proxies()返回的代理
+        :param ok: 是否成功
+        :param latency: 响应秒数
+        """
+        if not proxies:
+            return
+        proxy = proxies.get("https") or proxies.get("http")
+        health = self._health.get(proxy)
+        if health is None:
+            return
+        with self._lock:
+            health.error_rate = (1 - PROXY_EWMA) * health.error_rate + PROXY_EWMA * (0.0 if ok else 1.0)
+            if ok:
+                health.failures = 0
+                health.ejections = 0
+                if latency is not None:
+                    health.latency = (1 - PROXY_EWMA) * health.latency + PROXY_EWMA * latency
+                return
+            health.failures += 1
+            if health.failures >= PROXY_FAIL_EJECT:
+                cooldown = min(PROXY_COOLDOWN * (2 ** health.ejections), PROXY_COOLDOWN_MAX)
+                health.ejected_until = time.monotonic() + cooldown
+                health.ejections += 1
+                health.failures = 0
+                logging.info(f"proxys.report：代理{proxy}连续失败，暂停使用{cooldown}秒")
+
 """
     def get_proxies(self):
         if self.data is None:
@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import concurrent.futures
 import instock.core.stockfetch as stf
 import instock.core.tablestructure as tbs
 import instock.lib.trade_time as trd
@@ -26,28 +25,25 @@ class stock_data(metaclass=singleton_type):
 
 # 读取股票历史数据
 class stock_hist_data(metaclass=singleton_type):
-    def __init__(self, date=None, stocks=None, workers=16):
+    def __init__(self, date=None, stocks=None, workers=None, spot_append=True):
+        spot = None
         if stocks is None:
-            _subset = stock_data(date).get_data()[list(tbs.TABLE_CN_STOCK_FOREIGN_KEY['columns'])]
+            spot = stock_data(date).get_data()
+            _subset = spot[list(tbs.TABLE_CN_STOCK_FOREIGN_KEY['columns'])]
             stocks = [tuple(x) for x in _subset.values]
         if stocks is None:
             self.data = None
             return
         date_start, is_cache = trd.get_trade_hist_interval(stocks[0][0])  # 提高运行效率，只运行一次
+        if spot_append and is_cache and spot is not None:
+            # 收盘后用行情快照追加当天日K，只有新股、断档、除权的代码需要全量下载
+            stf.append_stocks_hist_from_spot(spot)
         _data = {}
         try:
-            # max_workers是None还是没有给出，将默认为机器cup个数*5
-            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-                future_to_stock = {executor.submit(stf.fetch_stock_hist, stock, date_start, is_cache): stock for stock
-                                   in stocks}
-                for future in concurrent.futures.as_completed(future_to_stock):
-                    stock = future_to_stock[future]
-                    try:
-                        __data = future.result()
-                        if __data is not None:
-                            _data[stock] = __data
-                    except Exception as e:
-                        logging.error(f"singleton.stock_hist_data处理异常：{stock[1]}代码{e}")
+            # 异步引擎并发抓取，workers为在途请求数，None使用引擎默认值
+            for stock, __data in stf.fetch_stocks_hist(stocks, date_start, is_cache, concurrency=workers):
+                if __data is not None:
+                    _data[stock] = __data
         except Exception as e:
             logging.error(f"singleton.stock_hist_data处理异常：{e}")
         if not _data:
@@ -12,6 +12,7 @@ __date__ = '2023/3/10 '
 # 读取股票交易日历数据
 class stock_trade_date(metaclass=singleton_type):
     def __init__(self):
+        self.data = None
         try:
             self.data = stf.fetch_stocks_trade_date()
         except Exception as e:
@@ -19,3 +20,13 @@ class stock_trade_date(metaclass=singleton_type):
 
     def get_data(self):
         return self.data
+
+    # 常驻进程跨日时重新读取，读取失败时保留原来的日历
+    def reload(self):
+        try:
+            data = stf.fetch_stocks_trade_date()
+            if data is not None:
+                self.data = data
+        except Exception as e:
+            logging.error(f"singleton.stock_trade_date.reload处理异常：{e}")
+        return self.data
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import zlib
+import numpy as np
+import pandas as pd
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+# 设置基础目录，每次加载使用。
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+spot_log_path = os.path.join(cpath_current, 'cache', 'spot_log')
+
+SPOT_LOG_KEYFRAME = 60  # 每隔多少个快照保存一次全量，还原时最多回放这么多个增量
+INDEX_DTYPE = np.dtype([('time', '<i8'), ('offset', '<u8'), ('length', '<u4'), ('cells', '<u4'), ('keyframe', 'u1')])
+CODE_DTYPE = np.dtype('<u2')
+FIELD_DTYPE = np.dtype('u1')
+VALUE_DTYPE = np.dtype('<f8')
+
+
+def _changed(prev, curr):
+    return ~((prev == curr) | (np.isnan(prev) & np.isnan(curr)))
+
+
+# 盘中行情快照的增量日志，每个交易日一个目录。
+# 第一个快照和此后每SPOT_LOG_KEYFRAME个快照保存全量，其余只保存和上一个快照相比变化的(代码, 字段, 值)。
+# 每个快照是blocks.bin中一段zlib压缩的列式数据(代码序号、字段序号、值三列)，index.bin记录时间和位置，两者都只追加。
+# 写入时内存中只保留上一个快照的数值矩阵。
+class spot_delta_log:
+    def __init__(self, name, date, fields=None, root=None):
+        """
+        :param name: 数据名称，如stock、etf
+        :param date: 交易日，datetime.date
+        :param fields: 数值字段，第一次写入时确定，之后以保存的为准
+        """
+        self.path = os.path.join(root or spot_log_path, name, date.strftime("%Y%m%d"))
+        self._lock = threading.Lock()
+        self._prev = None
+        self._count = 0
+        meta = self._read_json('meta.json')
+        self.fields = meta['fields'] if meta else list(fields or [])
+        codes = self._read_json('codes.json')
+        self.codes = codes['codes'] if codes else []
+        self.names = codes['names'] if codes else []
+        self._code_index = {c: i for i, c in enumerate(self.codes)}
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_json(self, name):
+        try:
+            with open(self._file(name), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_json(self, name, data):
+        if not os.path.exists(self.path):
+            os.makedirs(self.path, exist_ok=True)
+        tmp_file = self._file(f"{name}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, self._file(name))
+
+    def _read_index(self):
+        try:
+            with open(self._file('index.bin'), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        # 写到一半的记录不读取
+        return np.frombuffer(raw[:len(raw) - len(raw) % INDEX_DTYPE.itemsize], dtype=INDEX_DTYPE)
+
+    def _matrix(self, data):
+        # 按代码表顺序排列的数值矩阵，新出现的代码追加到代码表
+        added = False
+        names = data['name'].values if 'name' in data.columns else data['code'].values
+        for code, name in zip(data['code'].values, names):
+            if code not in self._code_index:
+                self._code_index[code] = len(self.codes)
+                self.codes.append(code)
+                self.names.append(name)
+                added = True
+        if added:
+            self._write_json('codes.json', {'codes': self.codes, 'names': self.names})
+        matrix = np.full((len(self.codes), len(self.fields)), np.nan, dtype=VALUE_DTYPE)
+        rows = np.fromiter((self._code_index[c] for c in data['code'].values), dtype=np.int64, count=len(data.index))
+        matrix[rows] = data[self.fields].apply(pd.to_numeric, errors='coerce').values.astype(VALUE_DTYPE)
+        return matrix, rows
+
+    def append(self, data, time=None):
+        """
+        追加一个快照
+        :param data: 行情DataFrame，包含code列和数值字段列
+        :param time: 快照时间，datetime.datetime，默认当前时间
+        :return: 本次保存的单元格数
+        """
+        time = time or datetime.datetime.now()
+        with self._lock:
+            if not self.fields:
+                raise ValueError("spot_delta_log没有指定数值字段")
+            if self._read_json('meta.json') is None:
+                self._write_json('meta.json', {'fields': self.fields})
+            index = self._read_index()
+            if self._prev is None and len(index) > 0:
+                self._prev = self.snapshot_matrix(index=index)  # 进程重启后接着写
+                self._count = len(index)
+            matrix, rows = self._matrix(data)
+            keyframe = self._prev is None or self._count % SPOT_LOG_KEYFRAME == 0
+            if self._prev is not None:
+                prev = self._prev
+                if prev.shape[0] < matrix.shape[0]:
+                    prev = np.vstack([prev, np.full((matrix.shape[0] - prev.shape[0], prev.shape[1]), np.nan)])
+                # 本次没有返回的代码沿用上一个快照
+                missing = np.ones(matrix.shape[0], dtype=bool)
+                missing[rows] = False
+                matrix[missing] = prev[missing]
+            if keyframe:
+                mask = ~np.isnan(matrix)
+            else:
+                mask = _changed(prev, matrix)
+            code_idx, field_idx = np.nonzero(mask)
+            block = zlib.compress(code_idx.astype(CODE_DTYPE).tobytes() + field_idx.astype(FIELD_DTYPE).tobytes()
+                                  + matrix[code_idx, field_idx].astype(VALUE_DTYPE).tobytes(), 1)
+            with open(self._file('blocks.bin'), 'ab') as f:
+                offset = f.tell()
+                f.write(block)
+            record = np.array([(int(time.timestamp() * 1000), offset, len(block), len(code_idx), keyframe)],
+                              dtype=INDEX_DTYPE)
+            with open(self._file('index.bin'), 'ab') as f:
+                f.write(record.tobytes())
+            self._prev = matrix
+            self._count += 1
+            return len(code_idx)
+
+    @staticmethod
+    def _decode(block, cells):
+        raw = zlib.decompress(block)
+        code_end = cells * CODE_DTYPE.itemsize
+        field_end = code_end + cells * FIELD_DTYPE.itemsize
+        return (np.frombuffer(raw[:code_end], dtype=CODE_DTYPE),
+                np.frombuffer(raw[code_end:field_end], dtype=FIELD_DTYPE),
+                np.frombuffer(raw[field_end:], dtype=VALUE_DTYPE))
+
+    def times(self):
+        """
+        :return: 全部快照时间
+        """
+        return [datetime.datetime.fromtimestamp(t / 1000) for t in self._read_index()['time']]
+
+    def snapshot_matrix(self, time=None, index=None):
+        """
+        还原time(含)之前最后一个快照的数值矩阵，time为空时还原最后一个快照
+        """
+        if index is None:
+            index = self._read_index()
+        if time is not None:
+            index = index[:np.searchsorted(index['time'], int(time.timestamp() * 1000), 'right')]
+        if len(index) == 0:
+            return None
+        start = np.nonzero(index['keyframe'])[0]
+        start = start[-1] if len(start) > 0 else 0
+        matrix = np.full((len(self.codes), len(self.fields)), np.nan, dtype=VALUE_DTYPE)
+        with open(self._file('blocks.bin'), 'rb') as f:
+            for record in index[start:]:
+                f.seek(int(record['offset']))
+                code_idx, field_idx, values = self._decode(f.read(int(record['length'])), int(record['cells']))
+                matrix[code_idx, field_idx] = values
+        return matrix
+
+    def snapshot(self, time=None):
+        """
+        还原time(含)之前最后一个快照
+        :param time: datetime.datetime，为空时还原最后一个快照
+        :return: DataFrame，列为code、name和数值字段，没有快照时返回None
+        """
+        with self._lock:
+            codes = self._read_json('codes.json')  # 可能由另一个进程写入
+            if codes is not None:
+                self.codes = codes['codes']
+                self.names = codes['names']
+                self._code_index = {c: i for i, c in enumerate(self.codes)}
+            matrix = self.snapshot_matrix(time)
+        if matrix is None:
+            return None
+        data = pd.DataFrame(matrix, columns=self.fields)
+        data.insert(0, 'name', self.names[:len(data.index)])
+        data.insert(0, 'code', self.codes[:len(data.index)])
+        return data.loc[~np.isnan(matrix).all(axis=1)].reset_index(drop=True)
+
+    @staticmethod
+    def purge(keep_days, root=None):
+        """
+        删除keep_days天之前的日志目录
+        """
+        root = root or spot_log_path
+        if not os.path.isdir(root):
+            return
+        before = (datetime.date.today() - datetime.timedelta(days=keep_days)).strftime("%Y%m%d")
+        for name in os.listdir(root):
+            name_path = os.path.join(root, name)
+            if not os.path.isdir(name_path):
+                continue
+            for day in os.listdir(name_path):
+                if day < before:
+                    shutil.rmtree(os.path.join(name_path, day), ignore_errors=True)
+                    logging.info(f"spot_delta_log.purge：删除{name}/{day}")
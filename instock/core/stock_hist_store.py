@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import instock.core.tablestructure as tbs
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+# 设置基础目录，每次加载使用。
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+stock_hist_store_path = os.path.join(cpath_current, 'cache', 'hist_store')
+etf_hist_store_path = os.path.join(cpath_current, 'cache', 'etf_hist_store')
+
+HIST_COLUMNS = tuple(tbs.CN_STOCK_HIST_DATA['columns'])
+HIST_DATE_DTYPE = np.int32  # 日期保存为yyyymmdd整数
+HIST_VALUE_DTYPE = np.float64  # 价格保留float64，复权比较需要精确到0.001
+ACCESS_MARK_SECONDS = 3600  # 读取时更新访问时间的最小间隔
+
+
+def mark_access(filename):
+    """
+    显式更新文件访问时间，保留修改时间。
+    noatime/relatime挂载时读取不会更新atime，缓存清理按访问时间淘汰依赖这里的标记。
+    """
+    try:
+        st = os.stat(filename)
+        now = time.time()
+        if now - st.st_atime > ACCESS_MARK_SECONDS:
+            os.utime(filename, (now, st.st_mtime))
+    except OSError:
+        pass
+
+
+@lru_cache(maxsize=None)
+def _date_str(value):
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+
+def _date_int(values):
+    if np.issubdtype(np.asarray(values).dtype, np.integer):
+        return np.asarray(values, dtype=HIST_DATE_DTYPE)
+    return np.fromiter((int(x.replace('-', '')) for x in values), dtype=HIST_DATE_DTYPE, count=len(values))
+
+
+def _date_key(date):
+    # YYYY-MM-DD或YYYYMMDD转为yyyymmdd整数
+    return int(date.replace('-', ''))
+
+
+# 按代码保存的增量历史数据仓库。
+# 每只代码一个目录，按列保存抓取过的全部日K，每列一个.npy文件(date为int32的yyyymmdd，其它列为float64)，
+# 读取时内存映射打开，只用到close、volume时不会读取其它列。旁边的json记录已覆盖的起始日期。
+# read、merge等仓库内部操作直接使用只读的内存映射，date保持整数；slice返回给计算使用的区间时
+# 才复制这一段并把date转为YYYY-MM-DD字符串(策略、指标按字符串比较和解析日期)。
+# 不直接返回内存映射：每个映射占用一个文件句柄，全部代码的数据在整个任务中都会保留。
+# 重写代码的文件前，调用方持有的内存映射先换成内存中的副本(Windows上不能替换仍被映射的文件)。
+# 只向接口请求最后一个已存日期之后的数据，任意[start, end]区间都从本地读取。
+class stock_hist_store:
+    _locks = {}
+    _locks_lock = threading.Lock()
+
+    def __init__(self, adjust='qfq', root=None):
+        self.adjust = adjust
+        self.root = os.path.join(root or stock_hist_store_path, adjust or 'none')
+        if not os.path.exists(self.root):
+            os.makedirs(self.root, exist_ok=True)
+
+    def _lock(self, code):
+        key = (self.root, code)
+        with stock_hist_store._locks_lock:
+            lock = stock_hist_store._locks.get(key)
+            if lock is None:
+                lock = stock_hist_store._locks[key] = threading.RLock()
+        return lock
+
+    def _dir(self, code):
+        return os.path.join(self.root, code)
+
+    def _column_file(self, code, column):
+        return os.path.join(self.root, code, f"{column}.npy")
+
+    def _legacy_file(self, code):
+        return os.path.join(self.root, f"{code}.gzip.pickle")
+
+    def _meta_file(self, code):
+        return os.path.join(self.root, f"{code}.json")
+
+    def _read(self, code, columns=None, mmap=True):
+        if columns is None:
+            columns = HIST_COLUMNS
+        elif 'date' not in columns:
+            columns = ('date',) + tuple(columns)
+        if not os.path.isfile(self._column_file(code, 'date')):
+            return self._read_legacy(code, columns)
+        arrays = {}
+        for column in columns:
+            arrays[column] = np.load(self._column_file(code, column), mmap_mode='r' if mmap else None)
+        # 其它进程写到一半时各列长度可能不一致，按最短的截取
+        size = min(len(a) for a in arrays.values())
+        return pd.DataFrame({column: arrays[column][:size] for column in columns}, columns=list(columns), copy=False)
+
+    def _read_legacy(self, code, columns):
+        # 旧的gzip pickle文件，读到后转换成按列保存
+        legacy_file = self._legacy_file(code)
+        if not os.path.isfile(legacy_file):
+            return None
+        data = pd.read_pickle(legacy_file, compression="gzip")
+        self._write(code, data)
+        os.remove(legacy_file)
+        return self._read(code, columns)
+
+    def _write(self, code, data):
+        # 每列先写临时文件再替换，避免并发读到写了一半的文件；date列最后替换
+        path = self._dir(code)
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        for column in HIST_COLUMNS[1:] + HIST_COLUMNS[:1]:
+            if column == 'date':
+                values = _date_int(data[column].values)
+            else:
+                values = np.ascontiguousarray(data[column].values, dtype=HIST_VALUE_DTYPE)
+            column_file = self._column_file(code, column)
+            tmp_file = f"{column_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_file, column_file)
+
+    def read_meta(self, code):
+        try:
+            with open(self._meta_file(code), 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _write_meta(self, code, meta):
+        with open(self._meta_file(code), 'w') as f:
+            json.dump(meta, f)
+
+    def read(self, code, columns=None):
+        """
+        读取代码的全部已存日K，各列是只读的内存映射，date为yyyymmdd整数
+        :param columns: 只读取的列，如('close', 'volume')，date列总会返回
+        """
+        with self._lock(code):
+            try:
+                mark_access(self._column_file(code, 'date'))
+                return self._read(code, columns)
+            except Exception as e:
+                logging.error(f"stock_hist_store.read处理异常：{code}代码{e}")
+        return None
+
+    def fetch_start(self, code, data, date_start, date):
+        """
+        计算需要向接口请求的起始日期
+        :param data: 已存数据
+        :param date_start: 需要覆盖的起始日期，YYYYMMDD
+        :param date: 需要覆盖到的交易日，YYYY-MM-DD
+        :return: (起始日期YYYYMMDD, 是否全量)，已是最新返回(None, False)
+        """
+        if data is None or len(data.index) == 0:
+            return date_start, True
+        start = self.read_meta(code).get('start')
+        if start is None or date_start < start:
+            return date_start, True
+        last_date = int(data['date'].values[-1])
+        if date is not None and last_date >= _date_key(date):
+            return None, False
+        # 从最后一个已存日期开始请求，多出的一根日K用于检查复权价格是否变化
+        return str(last_date), False
+
+    def replace(self, code, data, date_start, persist_before=None):
+        """
+        全量替换代码的数据，用于新代码和复权价格变化。调用前先释放该代码read返回的数据
+        :param persist_before: 只保存该日期(YYYY-MM-DD)之前的日K，盘中未完成的日K不落盘
+        """
+        data = data.assign(date=_date_int(data['date'].values))
+        with self._lock(code):
+            self._persist(code, data, persist_before, {'start': date_start})
+        return data
+
+    def merge(self, code, data, new_data, persist_before=None):
+        """
+        把增量数据追加到已存数据后面
+        :return: 合并后的数据；复权价格变化时返回None，需要全量重抓
+        """
+        if new_data is None or len(new_data.index) == 0:
+            return data
+        last_date = data['date'].values[-1]
+        new_data = new_data.assign(date=_date_int(new_data['date'].values))
+        overlap = new_data.loc[new_data['date'] == last_date]
+        if len(overlap.index) > 0 and abs(overlap.iloc[0]['close'] - data['close'].values[-1]) > 0.001:
+            logging.info(f"stock_hist_store.merge：{code}代码复权价格变化，重写全部历史")
+            return None
+        new_data = new_data.loc[new_data['date'] > last_date]
+        if len(new_data.index) == 0:
+            return data
+        merged = pd.concat([data, new_data], ignore_index=True)
+        with self._lock(code):
+            self._detach(data)
+            self._persist(code, merged, persist_before)
+        return merged
+
+    def append(self, code, data, bar):
+        """
+        追加一根日K(由行情快照生成)
+        :param data: 用于检查的已存数据，可以只读取了部分列
+        """
+        with self._lock(code):
+            self._detach(data)
+            stored = self._read(code, mmap=False)
+            merged = pd.concat([stored, bar.assign(date=_date_int(bar['date'].values))], ignore_index=True)
+            self._persist(code, merged)
+        return merged
+
+    @staticmethod
+    def _detach(data):
+        # 把read返回的内存映射列就地换成内存中的副本，释放映射和文件句柄
+        if data is not None:
+            for column in data.columns:
+                data[column] = np.array(data[column].values)
+
+    def _persist(self, code, data, persist_before=None, meta=None):
+        try:
+            if persist_before is not None:
+                data = data.loc[data['date'] < _date_key(persist_before)]
+            if len(data.index) > 0:
+                self._write(code, data)
+            if meta is not None:
+                self._write_meta(code, meta)
+        except Exception as e:
+            logging.error(f"stock_hist_store._persist处理异常：{code}代码{e}")
+
+    @staticmethod
+    def last_date(data):
+        """
+        :return: 最后一根日K的日期，YYYY-MM-DD
+        """
+        return _date_str(int(data['date'].values[-1]))
+
+    @staticmethod
+    def slice(data, date_start=None, date_end=None):
+        """
+        截取[date_start, date_end]区间，日期格式YYYYMMDD
+        :return: 区间数据的副本，date为YYYY-MM-DD字符串，区间为空时返回None
+        """
+        if data is None:
+            return None
+        dates = data['date'].values  # 按日期升序
+        start = 0 if date_start is None else np.searchsorted(dates, _date_key(date_start), 'left')
+        end = len(dates) if date_end is None else np.searchsorted(dates, _date_key(date_end), 'right')
+        if end <= start:
+            return None
+        window = {}
+        for column in data.columns:
+            if column == 'date':
+                window[column] = np.array([_date_str(x) for x in dates[start:end].tolist()], dtype=object)
+            else:
+                window[column] = np.array(data[column].values[start:end])
+        return pd.DataFrame(window, columns=data.columns, copy=False)
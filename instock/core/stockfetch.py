@@ -2,33 +2,64 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import os.path
 import datetime
+import os
+import threading
+import time
 import numpy as np
 import pandas as pd
 import talib as tl
 import instock.core.tablestructure as tbs
 import instock.lib.trade_time as trd
-import instock.core.crawling.trade_date_hist as tdh
-import instock.core.crawling.fund_etf_em as fee
-import instock.core.crawling.stock_selection as sst
-import instock.core.crawling.stock_lhb_em as sle
-import instock.core.crawling.stock_lhb_sina as sls
-import instock.core.crawling.stock_dzjy_em as sde
-import instock.core.crawling.stock_hist_em as she
-import instock.core.crawling.stock_fund_em as sff
-import instock.core.crawling.stock_fhps_em as sfe
-import instock.core.crawling.stock_chip_race as scr
-import instock.core.crawling.stock_limitup_reason as slr
+import instock.core.lhb_store as lhs
+from instock.core.hist_fetch_engine import hist_fetch_engine
+from instock.core.stock_hist_store import stock_hist_store, stock_hist_store_path, etf_hist_store_path
+from instock.core.trade_calendar import trade_calendar
+from instock.lib.lazy_import import lazy_import
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
 
-# 设置基础目录，每次加载使用。
 cpath_current = os.path.dirname(os.path.dirname(__file__))
-stock_hist_cache_path = os.path.join(cpath_current, 'cache', 'hist')
-if not os.path.exists(stock_hist_cache_path):
-    os.makedirs(stock_hist_cache_path)  # 创建多个文件夹结构。
+
+# 爬虫模块导入时会创建获取器、读取Cookie和代理配置，第一次使用时才导入。
+tdh = lazy_import('instock.core.crawling.trade_date_hist')
+fee = lazy_import('instock.core.crawling.fund_etf_em')
+sst = lazy_import('instock.core.crawling.stock_selection')
+sle = lazy_import('instock.core.crawling.stock_lhb_em')
+sls = lazy_import('instock.core.crawling.stock_lhb_sina')
+sde = lazy_import('instock.core.crawling.stock_dzjy_em')
+she = lazy_import('instock.core.crawling.stock_hist_em')
+sff = lazy_import('instock.core.crawling.stock_fund_em')
+sfe = lazy_import('instock.core.crawling.stock_fhps_em')
+scr = lazy_import('instock.core.crawling.stock_chip_race')
+slr = lazy_import('instock.core.crawling.stock_limitup_reason')
+
+# 历史数据批量抓取引擎，全部代码共享限速，第一次使用时创建。
+_hist_engine = None
+_hist_engine_lock = threading.Lock()
+
+
+def get_hist_engine():
+    global _hist_engine
+    with _hist_engine_lock:
+        if _hist_engine is None:
+            _hist_engine = hist_fetch_engine(she.fetcher)
+    return _hist_engine
+
+
+# 历史数据来源：stock股票，etf场内基金。两者日K字段相同，共用本地仓库格式和批量抓取流程。
+HIST_KIND_STOCK = 'stock'
+HIST_KIND_ETF = 'etf'
+
+
+def _hist_source(kind):
+    """
+    :return: (仓库目录, 单只抓取函数, 请求函数, 解析函数)
+    """
+    if kind == HIST_KIND_ETF:
+        return etf_hist_store_path, fee.fund_etf_hist_em, fee.fund_etf_hist_request, fee.fund_etf_hist_parse
+    return stock_hist_store_path, she.stock_zh_a_hist, she.stock_zh_a_hist_request, she.stock_zh_a_hist_parse
 
 
 # 600 601 603 605开头的股票是上证A股
@@ -62,11 +93,15 @@ def is_open_with_line(price):
 # 读取股票交易日历数据
 def fetch_stocks_trade_date():
     try:
+        calendar = trade_calendar.load()  # 优先读取本地已解码的日历
+        if calendar is not None:
+            return calendar
         data = tdh.tool_trade_date_hist_sina()
         if data is None or len(data.index) == 0:
             return None
-        data_date = set(data['trade_date'].values.tolist())
-        return data_date
+        calendar = trade_calendar(data['trade_date'].values.tolist())
+        calendar.save()
+        return calendar
     except Exception as e:
         logging.error(f"stockfetch.fetch_stocks_trade_date处理异常：{e}")
     return None
@@ -108,12 +143,59 @@ def fetch_stocks(date):
     return None
 
 
-def fetch_stock_selection():
+# 综合选股的字段方案和慢变字段的抓取间隔，使用环境变量配置,docker -e 传递
+#   selection_profile=full|standard|lite，见tbs.SELECTION_PROFILES
+#   selection_heavy_hours=慢变字段(概念、基本面等)本地复用的小时数，0表示每次都抓取
+selection_profile = os.environ.get('selection_profile') or 'full'
+selection_heavy_hours = float(os.environ.get('selection_heavy_hours') or 20)
+selection_heavy_file = os.path.join(cpath_current, 'cache', 'selection_heavy.gzip.pickle')
+
+
+def _load_selection_heavy(columns):
+    # 返回仍在有效期内、字段一致的慢变字段数据
+    try:
+        if selection_heavy_hours <= 0 or not os.path.isfile(selection_heavy_file):
+            return None
+        if time.time() - os.path.getmtime(selection_heavy_file) > selection_heavy_hours * 3600:
+            return None
+        data = pd.read_pickle(selection_heavy_file, compression="gzip")
+        if list(data.columns) != columns:
+            return None
+        return data
+    except Exception as e:
+        logging.error(f"stockfetch._load_selection_heavy处理异常：{e}")
+    return None
+
+
+def _save_selection_heavy(data):
+    try:
+        path = os.path.dirname(selection_heavy_file)
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        tmp_file = f"{selection_heavy_file}.{os.getpid()}.tmp"
+        data.to_pickle(tmp_file, compression="gzip")
+        os.replace(tmp_file, selection_heavy_file)
+    except Exception as e:
+        logging.error(f"stockfetch._save_selection_heavy处理异常：{e}")
+
+
+# 读取综合选股数据，只请求字段方案中的字段；慢变字段在有效期内从本地读取，只请求快变字段。
+def fetch_stock_selection(profile=None):
     try:
-        data = sst.stock_selection()
+        groups = tbs.SELECTION_PROFILES[profile or selection_profile]
+        columns = tbs.get_selection_columns(groups)
+        heavy_columns = ['code'] + tbs.get_selection_columns(groups, heavy=True)
+        heavy = _load_selection_heavy(heavy_columns) if len(heavy_columns) > 1 else None
+        if heavy is None:
+            data = sst.stock_selection(columns)
+            if data is not None and len(data.index) > 0 and len(heavy_columns) > 1:
+                _save_selection_heavy(data[heavy_columns].drop_duplicates('code', keep='last'))
+        else:
+            data = sst.stock_selection(tbs.get_selection_columns(groups, heavy=False))
+            if data is not None and len(data.index) > 0:
+                data = data.merge(heavy, on='code', how='left')[columns]
         if data is None or len(data.index) == 0:
             return None
-        data.columns = list(tbs.TABLE_CN_STOCK_SELECTION['columns'])
         data.drop_duplicates('code', keep='last', inplace=True)
         return data
     except Exception as e:
@@ -168,15 +250,25 @@ def fetch_stocks_bonus(date):
     return None
 
 
+# 龙虎榜按交易日保存在本地，每次只抓取还没有的交易日
+LHB_DETAIL_MUTABLE_DAYS = 10  # 龙虎榜详情的上榜后10日涨跌幅在上榜后10个交易日内会更新
+
+
+def _lhb_detail_store():
+    return lhs.lhb_store('detail', sle.stock_lhb_detail_em, '上榜日', mutable_days=LHB_DETAIL_MUTABLE_DAYS)
+
+
+def _lhb_jgmmtj_store():
+    return lhs.lhb_store('jgmmtj', sle.stock_lhb_jgmmtj_em, '上榜日期')
+
+
 # 股票近三月上龙虎榜且必须有2次以上机构参与的
 def fetch_stock_top_entity_data(date):
     run_date = date + datetime.timedelta(days=-90)
-    start_date = run_date.strftime("%Y%m%d")
-    end_date = date.strftime("%Y%m%d")
     code_name = '代码'
     entity_amount_name = '买方机构数'
     try:
-        data = sle.stock_lhb_jgmmtj_em(start_date, end_date)
+        data = _lhb_jgmmtj_store().load(run_date, date)
         if data is None or len(data.index) == 0:
             return None
 
@@ -202,12 +294,13 @@ def fetch_stock_top_entity_data(date):
 # 描述: 获取东方财富-龙虎榜-个股上榜统计
 def fetch_stock_lhb_data(date,count=12):
     try:
-        start_date = trd.get_previous_trade_date(date,count).strftime("%Y%m%d")
-        end_date = date.strftime("%Y%m%d")
+        start_date = trd.get_previous_trade_date(date,count)
 
-        data = sle.stock_lhb_detail_em(start_date, end_date)
+        data = _lhb_detail_store().load(start_date, date)
         if data is None or len(data.index) == 0:
             return None
+        # 和接口返回的顺序一致：代码升序，上榜日降序
+        data = data.sort_values(by=['代码', '上榜日'], ascending=[True, False], kind='stable')
         _columns = list(tbs.TABLE_CN_STOCK_lHB['columns'])
         _columns.pop(0)
         data.columns = _columns
@@ -316,34 +409,43 @@ def fetch_stock_limitup_reason(date):
         logging.error(f"stockfetch.fetch_stock_limitup_reason处理异常：{e}")
     return None
 
-# 读取股票历史数据
-def fetch_etf_hist(data_base, date_start=None, date_end=None, adjust='qfq'):
+# 读取ETF历史数据，和股票共用增量仓库的流程，仓库目录分开。
+def fetch_etf_hist(data_base, date_start=None, date_end=None, adjust='qfq', is_cache=True):
     date = data_base[0]
     code = data_base[1]
 
     if date_start is None:
         date_start, is_cache = trd.get_trade_hist_interval(date)  # 提高运行效率，只运行一次
     try:
-        if date_end is not None:
-            data = fee.fund_etf_hist_em(symbol=code, period="daily", start_date=date_start, end_date=date_end,
-                                        adjust=adjust)
-        else:
-            data = fee.fund_etf_hist_em(symbol=code, period="daily", start_date=date_start, adjust=adjust)
-
-        if data is None or len(data.index) == 0:
-            return None
-        data.columns = tuple(tbs.CN_STOCK_HIST_DATA['columns'])
-        data = data.sort_index()  # 将数据按照日期排序下。
+        data = stock_hist_cache(code, date_start, date_end, is_cache, adjust, date=date, kind=HIST_KIND_ETF)
         if data is not None:
-            data.loc[:, 'p_change'] = tl.ROC(data['close'].values, 1)
-            data['p_change'].values[np.isnan(data['p_change'].values)] = 0.0
-            data["volume"] = data['volume'].values.astype('double') * 100  # 成交量单位从手变成股。
+            _stock_hist_post_process(data)
         return data
     except Exception as e:
         logging.error(f"stockfetch.fetch_etf_hist处理异常：{e}")
     return None
 
 
+# 批量读取ETF历史数据，每完成一只就返回一只。
+def fetch_etfs_hist(etfs, date_start, is_cache=True, adjust='qfq', concurrency=None):
+    return fetch_stocks_hist(etfs, date_start, is_cache, adjust, concurrency, kind=HIST_KIND_ETF)
+
+
+# 行情快照保存后预先把全部ETF的增量日K抓进本地仓库，后续按代码读取时不再访问接口。
+def prefetch_etfs_hist(etfs, adjust='qfq'):
+    if not etfs:
+        return 0
+    count = 0
+    try:
+        date_start, is_cache = trd.get_trade_hist_interval(etfs[0][0])
+        for etf, data in fetch_etfs_hist(etfs, date_start, is_cache, adjust):
+            count += 1
+    except Exception as e:
+        logging.error(f"stockfetch.prefetch_etfs_hist处理异常：{e}")
+    logging.info(f"stockfetch.prefetch_etfs_hist：{etfs[0][0]}更新ETF历史数据{count}只")
+    return count
+
+
 # 读取股票历史数据
 def fetch_stock_hist(data_base, date_start=None, is_cache=True):
     date = data_base[0]
@@ -353,49 +455,166 @@ def fetch_stock_hist(data_base, date_start=None, is_cache=True):
         date_start, is_cache = trd.get_trade_hist_interval(date)  # 提高运行效率，只运行一次
         # date_end = date_end.strftime("%Y%m%d")
     try:
-        data = stock_hist_cache(code, date_start, None, is_cache, 'qfq')
+        data = stock_hist_cache(code, date_start, None, is_cache, 'qfq', date=date)
         if data is not None:
-            data.loc[:, 'p_change'] = tl.ROC(data['close'].values, 1)
-            data['p_change'].values[np.isnan(data['p_change'].values)] = 0.0
-            data["volume"] = data['volume'].values.astype('double') * 100  # 成交量单位从手变成股。
+            _stock_hist_post_process(data)
         return data
     except Exception as e:
         logging.error(f"stockfetch.fetch_stock_hist处理异常：{e}")
     return None
 
 
-# 增加读取股票缓存方法。加快处理速度。多线程解决效率
-def stock_hist_cache(code, date_start, date_end=None, is_cache=True, adjust=''):
-    cache_dir = os.path.join(stock_hist_cache_path, date_start[0:6], date_start)
-    # 如果没有文件夹创建一个。月文件夹和日文件夹。方便删除。
+# 批量读取股票历史数据，先读本地仓库，需要更新的交给异步引擎并发抓取增量，每完成一只就返回一只。
+def fetch_stocks_hist(stocks, date_start, is_cache=True, adjust='qfq', concurrency=None, kind=HIST_KIND_STOCK):
+    store_path, hist_func, request_func, parse_func = _hist_source(kind)
+    store = stock_hist_store(adjust, root=store_path)
+    engine = get_hist_engine()
+    if concurrency is not None:
+        engine = hist_fetch_engine(she.fetcher, concurrency=concurrency)
+    persist_before = None if is_cache else stocks[0][0] if stocks else None  # 盘中未完成的日K不落盘
+    tasks = []
+    incremental = set()
+    for stock in stocks:
+        code = stock[1]
+        try:
+            # 判断是否需要更新只用到date列；需要增量的代码合并时再读取，抓取期间不持有内存映射
+            data = store.read(code, columns=())
+            fetch_start, is_full = store.fetch_start(code, data, date_start, stock[0])
+            if fetch_start is None:
+                data = store.slice(store.read(code), date_start)
+                if data is not None:
+                    yield stock, _stock_hist_post_process(data)
+                continue
+            if not is_full:
+                incremental.add(stock)
+            url, params = request_func(symbol=code, period="daily", start_date=fetch_start, adjust=adjust)
+            tasks.append((stock, url, params))
+        except Exception as e:
+            logging.error(f"stockfetch.fetch_stocks_hist处理异常：{code}代码{e}")
+
+    # 第二轮：复权价格变化的代码全量重抓
+    while tasks:
+        retasks = []
+        for stock, new_data in engine.iter_fetch(tasks, parse_func):
+            code = stock[1]
+            try:
+                if new_data is not None and len(new_data.index) > 0:
+                    new_data = _stock_hist_format(new_data)
+                if stock not in incremental:
+                    data = None
+                    if new_data is None or len(new_data.index) == 0:
+                        continue
+                    data = store.replace(code, new_data, date_start, persist_before)
+                else:
+                    incremental.discard(stock)
+                    data = store.read(code)
+                    data = store.merge(code, data, new_data, persist_before)
+                    if data is None:
+                        url, params = request_func(symbol=code, period="daily", start_date=date_start,
+                                                   adjust=adjust)
+                        retasks.append((stock, url, params))
+                        continue
+                data = store.slice(data, date_start)
+                if data is not None:
+                    yield stock, _stock_hist_post_process(data)
+            except Exception as e:
+                logging.error(f"stockfetch.fetch_stocks_hist处理异常：{code}代码{e}")
+        tasks = retasks
+
+
+# 收盘后行情快照字段和日K字段的对应关系
+_SPOT_HIST_COLUMNS = {'open_price': 'open', 'new_price': 'close', 'high_price': 'high', 'low_price': 'low',
+                      'volume': 'volume', 'deal_amount': 'amount', 'amplitude': 'amplitude',
+                      'change_rate': 'quote_change', 'ups_downs': 'ups_downs', 'turnoverrate': 'turnover'}
+
+
+# 判断行情快照是否已经是date当天的完整日K：当天已收盘，或者是上个交易日且今天还未开始竞价。
+def spot_is_daily_bar(date):
+    now_time = datetime.datetime.now()
+    now_date = now_time.date()
+    if date == now_date:
+        return trd.is_trade_date(now_date) and trd.is_close(now_time)
+    run_date, run_date_nph = trd.get_trade_date_last()
+    if date != run_date:
+        return False
+    return not trd.is_trade_date(now_date) or now_time.time() < trd.OPEN_TIME[0][0]
+
+
+# 用收盘后的行情快照生成当天日K，追加到本地历史仓库。
+# 新股、仓库断档、除权除息(快照昨收和仓库最后收盘价不一致，前复权价格已变化)的代码不处理，由增量抓取处理。
+def append_stocks_hist_from_spot(spot, adjust='qfq'):
+    if spot is None or len(spot.index) == 0:
+        return 0
+    date = spot.iloc[0]['date']
     try:
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-    except Exception:
-        pass
-    cache_file = os.path.join(cache_dir, "%s%s.gzip.pickle" % (code, adjust))
-    # 如果缓存存在就直接返回缓存数据。压缩方式。
+        tmp_year, tmp_month, tmp_day = date.split("-")
+        run_date = datetime.date(int(tmp_year), int(tmp_month), int(tmp_day))
+        if not spot_is_daily_bar(run_date):
+            return 0
+        prev_str = trd.get_previous_trade_date(run_date).strftime("%Y-%m-%d")
+    except Exception as e:
+        logging.error(f"stockfetch.append_stocks_hist_from_spot处理异常：{e}")
+        return 0
+    store = stock_hist_store(adjust)
+    columns = list(tbs.CN_STOCK_HIST_DATA['columns'])
+    bars = spot[['code', 'pre_close_price'] + list(_SPOT_HIST_COLUMNS)].rename(columns=_SPOT_HIST_COLUMNS)
+    appended = 0
+    for row in bars.itertuples(index=False):
+        try:
+            hist = store.read(row.code, columns=('close',))
+            if hist is None or len(hist.index) == 0 or store.last_date(hist) != prev_str:
+                continue  # 新股或仓库断档
+            if abs(hist['close'].values[-1] - row.pre_close_price) > 0.001:
+                continue  # 除权除息，前复权价格已变化
+            bar = pd.DataFrame([[date] + [getattr(row, c) for c in columns[1:]]], columns=columns)
+            store.append(row.code, hist, bar)
+            appended += 1
+        except Exception as e:
+            logging.error(f"stockfetch.append_stocks_hist_from_spot处理异常：{row.code}代码{e}")
+    logging.info(f"stockfetch.append_stocks_hist_from_spot：{date}由行情快照追加日K{appended}只")
+    return appended
+
+
+# 历史数据统一处理：计算涨跌幅，成交量单位从手变成股。
+def _stock_hist_post_process(data):
+    data.loc[:, 'p_change'] = tl.ROC(data['close'].values, 1)
+    data['p_change'].values[np.isnan(data['p_change'].values)] = 0.0
+    data["volume"] = data['volume'].values.astype('double') * 100  # 成交量单位从手变成股。
+    return data
+
+
+def _stock_hist_format(stock):
+    stock.columns = tuple(tbs.CN_STOCK_HIST_DATA['columns'])
+    return stock.sort_index()  # 将数据按照日期排序下。
+
+
+# 读取股票历史数据，本地仓库只向接口请求最后一个已存日期之后的数据。
+# date为需要覆盖到的交易日(YYYY-MM-DD)，为空时每次都检查增量。
+def stock_hist_cache(code, date_start, date_end=None, is_cache=True, adjust='', date=None, kind=HIST_KIND_STOCK):
+    store_path, hist_func, request_func, parse_func = _hist_source(kind)
+    store = stock_hist_store(adjust, root=store_path)
+    persist_before = None if is_cache else date  # 盘中未完成的日K不落盘
     try:
-        if os.path.isfile(cache_file):
-            return pd.read_pickle(cache_file, compression="gzip")
-        else:
-            if date_end is not None:
-                stock = she.stock_zh_a_hist(symbol=code, period="daily", start_date=date_start, end_date=date_end,
-                                            adjust=adjust)
-            else:
-                stock = she.stock_zh_a_hist(symbol=code, period="daily", start_date=date_start, adjust=adjust)
-
-            if stock is None or len(stock.index) == 0:
-                return None
-            stock.columns = tuple(tbs.CN_STOCK_HIST_DATA['columns'])
-            stock = stock.sort_index()  # 将数据按照日期排序下。
-            try:
-                if is_cache:
-                    stock.to_pickle(cache_file, compression="gzip")
-            except Exception:
-                pass
-            # time.sleep(1)
-            return stock
+        data = store.read(code)
+        fetch_start, is_full = store.fetch_start(code, data, date_start, date)
+        if fetch_start is not None:
+            if is_full:
+                data = None  # 全量重写，先释放已存数据的内存映射
+            new_data = hist_func(symbol=code, period="daily", start_date=fetch_start, adjust=adjust)
+            if new_data is not None and len(new_data.index) > 0:
+                new_data = _stock_hist_format(new_data)
+            if not is_full:
+                data = store.merge(code, data, new_data, persist_before)
+            if is_full or data is None:
+                if data is None and not is_full:
+                    # 复权价格变化，只重写这一只代码
+                    new_data = hist_func(symbol=code, period="daily", start_date=date_start, adjust=adjust)
+                    if new_data is not None and len(new_data.index) > 0:
+                        new_data = _stock_hist_format(new_data)
+                if new_data is None or len(new_data.index) == 0:
+                    return None
+                data = store.replace(code, new_data, date_start, persist_before)
+        return store.slice(data, date_start, date_end)
     except Exception as e:
         logging.error(f"stockfetch.stock_hist_cache处理异常：{code}代码{e}")
     return None
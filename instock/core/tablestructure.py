@@ -929,6 +929,28 @@ TABLE_CN_STOCK_SELECTION = {'name': 'cn_stock_selection', 'cn': '综合选股',
                                         'secucode': {'type': VARCHAR(10, _COLLATE), 'cn': '全代码', 'size': 0,
                                                      'map': 'SECUCODE'}}}
 
+# 综合选股字段分组，按TABLE_CN_STOCK_SELECTION的字段顺序取(第一个字段, 最后一个字段)区间。
+# heavy为变化较慢的字段(概念板块、基本面、事件、机构持股)，可以低频抓取后复用。
+SELECTION_FIELD_GROUPS = {
+    'base': {'ranges': (('date', 'name'), ('secucode', 'secucode')), 'heavy': False},
+    'price': {'ranges': (('new_price', 'turnoverrate'),), 'heavy': False},
+    'profile': {'ranges': (('listing_date', 'is_cy50'),), 'heavy': True},
+    'valuation': {'ranges': (('pe9', 'enterprise_value_multiple'),), 'heavy': False},
+    'fundamental': {'ranges': (('basic_eps', 'free_hold_ratio'),), 'heavy': True},
+    'technical': {'ranges': (('macd_golden_fork', 'narrow_finish'),), 'heavy': False},
+    'event': {'ranges': (('limited_lift_f6m', 'org_rating'),), 'heavy': True},
+    'institution': {'ranges': (('allcorp_num', 'allcorp_xt_ratio'),), 'heavy': True},
+    'popularity': {'ranges': (('popularity_rank', 'browse_rank'),), 'heavy': False},
+    'market': {'ranges': (('amplitude', 'hold_ratio'),), 'heavy': False},
+}
+
+# 综合选股字段方案：部署时按实际保存和使用的数据选择，base分组总是包含
+SELECTION_PROFILES = {
+    'full': tuple(SELECTION_FIELD_GROUPS),
+    'standard': ('base', 'price', 'profile', 'valuation', 'fundamental', 'technical', 'market'),
+    'lite': ('base', 'price', 'profile', 'valuation'),
+}
+
 CN_STOCK_CPBD = {'name': 'cn_stock_cpbd', 'cn': '操盘必读',
                  'columns': {'SECURITY_CODE': {'type': VARCHAR(6, _COLLATE), 'cn': '代码'},
                              'SECURITY_NAME_ABBR': {'type': VARCHAR(20, _COLLATE), 'cn': '名称'},
@@ -1035,6 +1057,35 @@ TABLE_CN_STOCK_LIMITUP_REASON = {'name': 'cn_stock_limitup_reason', 'cn': '涨
                                  'dde': {'type': BIGINT, 'cn': 'DDE', 'size': 90}}}
 
 
+# 数据库表的主键和二级索引：(表, 主键字段, {索引名: 索引字段})。
+# init_job按此建表，已有的表补齐缺少的字段、主键和索引。
+# 网页和选股按`date`查询，由主键(date, code)的前缀满足；
+# 回测按`date` < ? AND 最后一个收益率字段 IS NULL 查找还没有回测的记录，需要单独的索引。
+_BACKTEST_INDEXES = {'INIX_BACKTEST': (tuple(TABLE_CN_STOCK_BACKTEST_DATA['columns'])[-1], 'date')}
+TABLE_SCHEMAS = [
+    (TABLE_CN_STOCK_ATTENTION, ('code',), {'INIX_DATETIME': ('datetime',)}),
+    (TABLE_CN_ETF_SPOT, ('date', 'code'), None),
+    (TABLE_CN_STOCK_SPOT, ('date', 'code'), None),
+    (TABLE_CN_STOCK_SPOT_BUY, ('date', 'code'), None),
+    (TABLE_CN_STOCK_SELECTION, ('date', 'code'), None),
+    (TABLE_CN_STOCK_FUND_FLOW, ('date', 'code'), None),
+    (TABLE_CN_STOCK_FUND_FLOW_INDUSTRY, ('date', 'name'), None),
+    (TABLE_CN_STOCK_FUND_FLOW_CONCEPT, ('date', 'name'), None),
+    (TABLE_CN_STOCK_BONUS, ('date', 'code'), None),
+    (TABLE_CN_STOCK_TOP, ('date', 'code'), None),
+    (TABLE_CN_STOCK_lHB, ('date', 'code'), None),
+    (TABLE_CN_STOCK_BLOCKTRADE, ('date', 'code'), None),
+    (TABLE_CN_STOCK_CHIP_RACE_OPEN, ('date', 'code'), None),
+    (TABLE_CN_STOCK_CHIP_RACE_END, ('date', 'code'), None),
+    (TABLE_CN_STOCK_LIMITUP_REASON, ('date', 'code'), None),
+    (TABLE_CN_STOCK_INDICATORS, ('date', 'code'), None),
+    (TABLE_CN_STOCK_INDICATORS_BUY, ('date', 'code'), _BACKTEST_INDEXES),
+    (TABLE_CN_STOCK_INDICATORS_SELL, ('date', 'code'), _BACKTEST_INDEXES),
+    (TABLE_CN_STOCK_KLINE_PATTERN, ('date', 'code'), None),
+]
+TABLE_SCHEMAS.extend((table, ('date', 'code'), _BACKTEST_INDEXES) for table in TABLE_CN_STOCK_STRATEGIES)
+
+
 def get_field_cn(key, table):
     f = table.get('columns').get(key)
     if f is None:
@@ -1068,6 +1119,23 @@ def get_field_types(cols):
     return data
 
 
+def get_selection_columns(groups, heavy=None):
+    """
+    综合选股分组对应的字段，按表字段顺序
+    :param groups: 分组名列表
+    :param heavy: True只取慢变字段，False只取快变字段，None全部
+    """
+    keys = list(TABLE_CN_STOCK_SELECTION['columns'])
+    selected = set()
+    for group in set(groups) | {'base'}:
+        g = SELECTION_FIELD_GROUPS[group]
+        if heavy is not None and g['heavy'] != heavy:
+            continue
+        for first, last in g['ranges']:
+            selected.update(keys[keys.index(first):keys.index(last) + 1])
+    return [k for k in keys if k in selected]
+
+
 def get_field_type_name(col_type):
     if col_type == DATE:
         return "datetime"
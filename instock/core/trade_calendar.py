@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import logging
+import os
+import time
+import numpy as np
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+# 设置基础目录，每次加载使用。
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+trade_calendar_file = os.path.join(cpath_current, 'cache', 'trade_calendar.npy')
+TRADE_CALENDAR_TTL = 7 * 24 * 3600  # 本地日历的有效期，交易所会临时调整休市安排
+
+
+def _to_day(date):
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    return np.datetime64(date, 'D')
+
+
+# 交易日历索引。
+# 交易日保存为排好序的datetime64[D]数组，前后第N个交易日、区间内交易日数和交易日列表都用二分查找得到。
+# 支持 date in calendar，可以直接替代原来的交易日set。
+class trade_calendar:
+    def __init__(self, dates):
+        """
+        :param dates: 交易日，datetime.date或datetime64的序列
+        """
+        self.dates = np.unique(np.asarray(dates, dtype='datetime64[D]'))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __contains__(self, date):
+        day = _to_day(date)
+        i = np.searchsorted(self.dates, day)
+        return i < len(self.dates) and self.dates[i] == day
+
+    def _date(self, i):
+        i = min(max(i, 0), len(self.dates) - 1)  # 超出日历范围时取第一个或最后一个交易日
+        return self.dates[i].astype(datetime.date)
+
+    def previous(self, date, count=1):
+        """
+        date之前的第count个交易日
+        """
+        return self._date(np.searchsorted(self.dates, _to_day(date), 'left') - count)
+
+    def next(self, date, count=1):
+        """
+        date之后的第count个交易日
+        """
+        return self._date(np.searchsorted(self.dates, _to_day(date), 'right') + count - 1)
+
+    def count(self, start, end):
+        """
+        [start, end]区间内的交易日数
+        """
+        return int(np.searchsorted(self.dates, _to_day(end), 'right')
+                   - np.searchsorted(self.dates, _to_day(start), 'left'))
+
+    def range(self, start, end):
+        """
+        [start, end]区间内的交易日列表
+        """
+        i = np.searchsorted(self.dates, _to_day(start), 'left')
+        j = np.searchsorted(self.dates, _to_day(end), 'right')
+        return self.dates[i:j].astype(datetime.date).tolist()
+
+    def save(self, filename=trade_calendar_file):
+        path = os.path.dirname(filename)
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        tmp_file = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            np.save(f, self.dates)
+        os.replace(tmp_file, filename)
+
+    @staticmethod
+    def load(filename=trade_calendar_file):
+        """
+        读取本地保存的日历，过期或已不包含今天之后的日期时返回None
+        """
+        try:
+            if not os.path.isfile(filename):
+                return None
+            if time.time() - os.path.getmtime(filename) > TRADE_CALENDAR_TTL:
+                return None
+            calendar = trade_calendar(np.load(filename))
+            if len(calendar) == 0 or calendar.dates[-1] < _to_day(datetime.date.today()):
+                return None
+            return calendar
+        except Exception as e:
+            logging.error(f"trade_calendar.load处理异常：{e}")
+        return None
@@ -28,16 +28,7 @@ def save_nph_stock_spot_data(date, before=True):
         if data is None or len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_SPOT['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_SPOT['columns'])
-
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_SPOT, "`date`,`code`", {'date': date})
 
     except Exception as e:
         logging.error(f"basic_data_daily_job.save_stock_spot_data处理异常：{e}")
@@ -53,16 +44,10 @@ def save_nph_etf_spot_data(date, before=True):
         if data is None or len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_ETF_SPOT['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_ETF_SPOT['columns'])
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_ETF_SPOT, "`date`,`code`", {'date': date})
 
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        # 预先更新ETF历史数据仓库，指标页面直接读取本地数据
+        stf.prefetch_etfs_hist([tuple(x) for x in data[['date', 'code', 'name']].values])
     except Exception as e:
         logging.error(f"basic_data_daily_job.save_nph_etf_spot_data处理异常：{e}")
 
@@ -28,15 +28,7 @@ def save_nph_stock_lhb_data(date, before=True):
         if data is None or len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_lHB['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_lHB['columns'])
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_lHB, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"basic_data_other_daily_job.save_stock_lhb_data处理异常：{e}")
     stock_spot_buy(date)
@@ -51,15 +43,7 @@ def save_nph_stock_top_data(date, before=True):
         if data is None or len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_TOP['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_TOP['columns'])
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_TOP, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"basic_data_other_daily_job.save_stock_top_data处理异常：{e}")
     stock_spot_buy(date)
@@ -90,16 +74,7 @@ def save_nph_stock_fund_flow_data(date, before=True):
 
         data.insert(0, 'date', date.strftime("%Y-%m-%d"))
 
-        table_name = tbs.TABLE_CN_STOCK_FUND_FLOW['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_FUND_FLOW['columns'])
-
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_FUND_FLOW, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"basic_data_other_daily_job.save_nph_stock_fund_flow_data处理异常：{e}")
 
@@ -167,16 +142,7 @@ def stock_sector_fund_flow_data(date, index_sector):
             tbs_table = tbs.TABLE_CN_STOCK_FUND_FLOW_INDUSTRY
         else:
             tbs_table = tbs.TABLE_CN_STOCK_FUND_FLOW_CONCEPT
-        table_name = tbs_table['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs_table['columns'])
-
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`name`")
+        mdb.replace_table_from_df(data, tbs_table, "`date`,`name`", {'date': date})
     except Exception as e:
         logging.error(f"basic_data_other_daily_job.stock_sector_fund_flow_data处理异常：{e}")
 
@@ -212,15 +178,7 @@ def save_nph_stock_bonus(date, before=True):
         if data is None or len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_BONUS['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_BONUS['columns'])
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_BONUS, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"basic_data_other_daily_job.save_nph_stock_bonus处理异常：{e}")
 
@@ -239,16 +197,7 @@ def stock_spot_buy(date):
         if len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_SPOT_BUY['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_SPOT_BUY['columns'])
-
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_SPOT_BUY, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"basic_data_other_daily_job.stock_spot_buy处理异常：{e}")
 
@@ -260,16 +209,7 @@ def stock_chip_race_open_data(date):
         if data is None or len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_CHIP_RACE_OPEN['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_CHIP_RACE_OPEN['columns'])
-
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_CHIP_RACE_OPEN, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"basic_data_other_daily_job.stock_chip_race_open_data：{e}")
 
@@ -281,16 +221,7 @@ def stock_imitup_reason_data(date):
         if data is None or len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_LIMITUP_REASON['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_LIMITUP_REASON['columns'])
-
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_LIMITUP_REASON, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"basic_data_other_daily_job.stock_imitup_reason_data：{e}")
 
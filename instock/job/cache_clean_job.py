@@ -0,0 +1,39 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import logging
+import os.path
+import sys
+
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
+sys.path.append(cpath)
+from instock.core.cache_manager import cache_manager
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+
+# 清理本地历史数据缓存，使磁盘占用保持在预算内。
+def main(budget_mb=None, max_age_days=None, dry_run=False):
+    try:
+        budget_bytes = None if budget_mb is None else budget_mb * 1024 * 1024
+        return cache_manager(budget_bytes, max_age_days).collect(dry_run)
+    except Exception as e:
+        logging.error(f"cache_clean_job.main处理异常：{e}")
+    return None
+
+
+# main函数入口
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='清理本地历史数据缓存')
+    parser.add_argument('--budget-mb', type=int, default=None, help='缓存占用上限(MB)')
+    parser.add_argument('--max-age-days', type=int, default=None, help='超过该天数未访问的代码直接清理')
+    parser.add_argument('--dry-run', action='store_true', help='只统计不删除')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.INFO)
+    stats = main(args.budget_mb, args.max_age_days, args.dry_run)
+    if stats is not None:
+        for k, v in stats.items():
+            print(f"{k}: {v}")
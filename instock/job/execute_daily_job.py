@@ -27,6 +27,11 @@ import strategy_data_daily_job as sdj
 import backtest_data_daily_job as bdj
 import klinepattern_data_daily_job as kdj
 import selection_data_daily_job as sddj
+import cache_clean_job as ccj
+import instock.lib.database as mdb
+from instock.core.fetch_metrics import fetch_metrics
+from instock.core.http_client import http_client
+from instock.core.request_cache import request_cache
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
@@ -36,27 +41,38 @@ def main():
     start = time.time()
     _start = datetime.datetime.now()
     logging.info("######## 任务执行时间: %s #######" % _start.strftime("%Y-%m-%d %H:%M:%S.%f"))
-    # 第1步创建数据库
-    bj.main()
-    # 第2.1步创建股票基础数据表
-    hdj.main()
-    # 第2.2步创建综合股票数据表
-    sddj.main()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        # 第3.1步创建股票其它基础数据表
-        executor.submit(hdtj.main)
-        # 第3.2步创建股票指标数据表
-        executor.submit(gdj.main)
-        # 第4步创建股票k线形态表
-        executor.submit(kdj.main)
-        # 第5步创建股票策略数据表
-        executor.submit(sdj.main)
+    # 同一次运行中相同的接口请求只访问一次网络
+    with request_cache().run():
+        # 第1步创建数据库
+        bj.main()
+        # 第2.1步创建股票基础数据表
+        hdj.main()
+        # 第2.2步创建综合股票数据表
+        sddj.main()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            # 第3.1步创建股票其它基础数据表
+            executor.submit(hdtj.main)
+            # 第3.2步创建股票指标数据表
+            executor.submit(gdj.main)
+            # 第4步创建股票k线形态表
+            executor.submit(kdj.main)
+            # 第5步创建股票策略数据表
+            executor.submit(sdj.main)
 
-    # # # # 第6步创建股票回测
-    # bdj.main()
+        # # # # 第6步创建股票回测
+        # bdj.main()
 
-    # # # # 第7步创建股票闭盘后才有的数据
-    acdj.main()
+        # # # # 第7步创建股票闭盘后才有的数据
+        acdj.main()
+
+        # 第8步清理本地历史数据缓存
+        ccj.main()
+
+    http_client().log_stats()
+    # 按接口的抓取统计，写入log/fetch_metrics.json供web服务查看
+    fetch_metrics().save()
+    fetch_metrics().log_summary()
+    mdb.log_pool_stats()
 
     logging.info("######## 完成任务, 使用时间: %s 秒 #######" % (time.time() - start))
 
@@ -0,0 +1,73 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import os.path
+import re
+import subprocess
+import sys
+
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
+sys.path.append(cpath)
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+# 入口模块的导入耗时预算(毫秒)，在干净的子进程中用 python -X importtime 测量
+IMPORT_BUDGETS = {
+    'instock.job.post_run_validate': 200,
+    'instock.job.init_job': 800,
+    'instock.lib.run_template': 1200,
+    'instock.core.stockfetch': 1200,
+    'instock.web.web_service': 1500,
+}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module):
+    """
+    :return: (总耗时毫秒, [(直接导入的模块, 毫秒), ...]按耗时排序)，导入失败时返回(None, 错误信息)
+    """
+    r = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                       cwd=cpath, capture_output=True, text=True)
+    if r.returncode != 0:
+        return None, r.stderr.strip().splitlines()[-1:]
+    total = 0
+    children = []
+    for line in r.stderr.splitlines():
+        m = _LINE.match(line)
+        if m is None:
+            continue
+        cumulative = int(m.group(2)) / 1000
+        depth = len(m.group(3))  # 每深一层多缩进2个空格，子模块先于父模块输出
+        if depth == 1:
+            if m.group(4) == module:
+                total = cumulative
+                break
+            children = []  # 解释器启动时的其它顶层导入
+        elif depth == 3:
+            children.append((m.group(4), cumulative))
+    return total, sorted(children, key=lambda x: -x[1])[:5]
+
+
+def main():
+    failed = []
+    for module, budget in IMPORT_BUDGETS.items():
+        total, detail = measure(module)
+        if total is None:
+            print(f"{module}: 导入失败 {detail}")
+            failed.append(module)
+            continue
+        status = 'OK' if total <= budget else '超出预算'
+        print(f"{module}: {total:.0f}ms / {budget}ms {status}")
+        for name, ms in detail:
+            print(f"    {name}: {ms:.0f}ms")
+        if total > budget:
+            failed.append(module)
+    return 1 if failed else 0
+
+
+# main函数入口
+if __name__ == '__main__':
+    sys.exit(main())
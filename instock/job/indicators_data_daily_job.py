@@ -35,14 +35,6 @@ def prepare(date):
         if results is None:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_INDICATORS['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_INDICATORS['columns'])
 
         dataKey = pd.DataFrame(results.keys())
         _columns = tuple(tbs.TABLE_CN_STOCK_FOREIGN_KEY['columns'])
@@ -57,7 +49,7 @@ def prepare(date):
         date_str = date.strftime("%Y-%m-%d")
         if date.strftime("%Y-%m-%d") != data.iloc[0]['date']:
             data['date'] = date_str
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_INDICATORS, "`date`,`code`", {'date': date_str})
 
     except Exception as e:
         logging.error(f"indicators_data_daily_job.prepare处理异常：{e}")
@@ -108,18 +100,10 @@ def guess_buy(date):
         if len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_INDICATORS_BUY['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_INDICATORS_BUY['columns'])
 
         _columns_backtest = tuple(tbs.TABLE_CN_STOCK_BACKTEST_DATA['columns'])
         data = pd.concat([data, pd.DataFrame(columns=_columns_backtest)])
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_INDICATORS_BUY, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"indicators_data_daily_job.guess_buy处理异常：{e}")
 
@@ -142,18 +126,10 @@ def guess_sell(date):
         if len(data.index) == 0:
             return
 
-        table_name = tbs.TABLE_CN_STOCK_INDICATORS_SELL['name']
-        # 删除老数据。
-        if mdb.checkTableIsExist(table_name):
-            del_sql = f"DELETE FROM `{table_name}` where `date` = '{date}'"
-            mdb.executeSql(del_sql)
-            cols_type = None
-        else:
-            cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_INDICATORS_SELL['columns'])
 
         _columns_backtest = tuple(tbs.TABLE_CN_STOCK_BACKTEST_DATA['columns'])
         data = pd.concat([data, pd.DataFrame(columns=_columns_backtest)])
-        mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+        mdb.replace_table_from_df(data, tbs.TABLE_CN_STOCK_INDICATORS_SELL, "`date`,`code`", {'date': date})
     except Exception as e:
         logging.error(f"indicators_data_daily_job.guess_sell处理异常：{e}")
 
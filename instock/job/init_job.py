@@ -11,6 +11,7 @@ cpath_current = os.path.dirname(os.path.dirname(__file__))
 cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
 sys.path.append(cpath)
 import instock.lib.database as mdb
+import instock.core.tablestructure as tbs
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
@@ -30,17 +31,14 @@ def create_new_database():
                 logging.error(f"init_job.create_new_database处理异常：{e}")
 
 
-# 创建基础表。
+# 按tablestructure创建全部表，已有的表补齐缺少的字段、主键和索引。
 def create_new_base_table():
-    with pymysql.connect(**mdb.MYSQL_CONN_DBAPI) as conn:
-        with conn.cursor() as db:
-            create_table_sql = """CREATE TABLE IF NOT EXISTS `cn_stock_attention` (
-                                  `datetime` datetime(0) NULL DEFAULT NULL, 
-                                  `code` varchar(6) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
-                                  PRIMARY KEY (`code`) USING BTREE,
-                                  INDEX `INIX_DATETIME`(`datetime`) USING BTREE
-                                  ) CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci ROW_FORMAT = Dynamic;"""
-            db.execute(create_table_sql)
+    mdb.schema_cache().invalidate_all()
+    for table, primary_keys, indexes in tbs.TABLE_SCHEMAS:
+        try:
+            mdb.sync_table(table['name'], tbs.get_field_types(table['columns']), primary_keys, indexes)
+        except Exception as e:
+            logging.error(f"init_job.create_new_base_table处理异常：{table['name']}表{e}")
 
 
 def check_database():
@@ -57,7 +55,9 @@ def main():
         logging.error("执行信息：数据库不存在，将创建。")
         # 检查数据库失败，
         create_new_database()
-    # 执行数据初始化。
+        return
+    # 执行数据初始化，已部署的库补齐缺少的索引。
+    create_new_base_table()
 
 
 # main函数入口
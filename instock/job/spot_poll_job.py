@@ -0,0 +1,114 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import datetime
+import logging
+import os.path
+import sys
+import time
+
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
+sys.path.append(cpath)
+log_path = os.path.join(cpath_current, 'log')
+if not os.path.exists(log_path):
+    os.makedirs(log_path)
+logging.basicConfig(format='%(asctime)s %(message)s', filename=os.path.join(log_path, 'stock_spot_poll.log'))
+logging.getLogger().setLevel(logging.INFO)
+import instock.core.stockfetch as stf
+import instock.core.tablestructure as tbs
+import instock.lib.trade_time as trd
+from instock.core.spot_delta_log import spot_delta_log
+from instock.core.singleton_trade_date import stock_trade_date
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+spot_poll_interval = 10  # 抓取间隔(秒)
+spot_log_keep_days = 10  # 增量日志保留天数
+
+# 使用环境变量配置,docker -e 传递
+_spot_poll_interval = os.environ.get('spot_poll_interval')
+if _spot_poll_interval is not None:
+    spot_poll_interval = float(_spot_poll_interval)
+_spot_log_keep_days = os.environ.get('spot_log_keep_days')
+if _spot_log_keep_days is not None:
+    spot_log_keep_days = int(_spot_log_keep_days)
+
+# (日志名称, 抓取函数, 表结构)
+SPOT_SOURCES = (
+    ('stock', stf.fetch_stocks, tbs.TABLE_CN_STOCK_SPOT),
+    ('etf', stf.fetch_etfs, tbs.TABLE_CN_ETF_SPOT),
+)
+
+
+def _numeric_fields(table):
+    cols = table['columns']
+    return [k for k in cols if tbs.get_field_type_name(cols[k]['type']) == 'numeric']
+
+
+def _seconds_to_open(now_time):
+    # 距离下一个开盘时段的秒数，当天已收盘时到次日零点重新判断
+    for begin, end in trd.OPEN_TIME:
+        if now_time.time() < begin:
+            return (datetime.datetime.combine(now_time.date(), begin) - now_time).total_seconds()
+    tomorrow = datetime.datetime.combine(now_time.date() + datetime.timedelta(days=1), datetime.time(0, 0, 0))
+    return (tomorrow - now_time).total_seconds()
+
+
+def _reload_calendar(today):
+    # 交易日历只在进程启动时读取一次，常驻运行时每天重新读取
+    calendar = stock_trade_date().reload()
+    if calendar is None or len(calendar) == 0:
+        logging.warning(f"spot_poll_job：{today}交易日历读取失败，稍后重试")
+        return False
+    last_date = calendar.dates[-1].astype(datetime.date)
+    if last_date < today:
+        logging.warning(f"spot_poll_job：交易日历只到{last_date}，今天{today}不在日历内，不会抓取")
+    return True
+
+
+def poll_once(logs, now_time):
+    for name, fetch, table in SPOT_SOURCES:
+        try:
+            data = fetch(now_time.date())
+            if data is None or len(data.index) == 0:
+                continue
+            log = logs.get(name)
+            if log is None:
+                log = logs[name] = spot_delta_log(name, now_time.date(), _numeric_fields(table))
+            log.append(data, now_time)
+        except Exception as e:
+            logging.error(f"spot_poll_job.poll_once处理异常：{name}{e}")
+
+
+# 盘中每隔interval秒抓取股票和ETF行情快照，只保存和上一个快照相比变化的部分。
+# 常驻运行，非交易时间休眠到下一个开盘时段。
+def main(interval=None):
+    interval = interval or spot_poll_interval
+    logs = {}
+    log_date = None
+    calendar_date = None
+    while True:
+        now_time = datetime.datetime.now()
+        if calendar_date != now_time.date() and _reload_calendar(now_time.date()):
+            calendar_date = now_time.date()
+        if not trd.is_trade_date(now_time.date()) or not trd.is_tradetime(now_time):
+            time.sleep(min(_seconds_to_open(now_time), 600))
+            continue
+        if log_date != now_time.date():
+            spot_delta_log.purge(spot_log_keep_days)
+            logs = {}
+            log_date = now_time.date()
+        start = time.monotonic()
+        poll_once(logs, now_time)
+        time.sleep(max(interval - (time.monotonic() - start), 0))
+
+
+# main函数入口
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='盘中行情快照增量抓取')
+    parser.add_argument('--interval', type=float, default=None, help='抓取间隔(秒)')
+    args = parser.parse_args()
+    main(args.interval)
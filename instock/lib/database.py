@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import collections
 import logging
 import os
+import threading
+import time
 import pymysql
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, MetaData, Table, Column, Index
+from sqlalchemy.types import to_instance
 from sqlalchemy.types import NVARCHAR
-from sqlalchemy import inspect
+from sqlalchemy import event
+from instock.lib.singleton_type import singleton_type
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
@@ -17,6 +22,12 @@ db_password = "785091"  # 数据库访问密码 - UPDATED
 db_database = "instockdb"  # 数据库名称
 db_port = 3306  # 数据库服务端口
 db_charset = "utf8mb4"  # 数据库字符集
+db_batch_size = 2000  # 批量写入时每条INSERT语句的行数
+db_pool_size = 8  # 连接池保持的连接数
+db_pool_max_overflow = 16  # 连接池满时最多再临时创建的连接数
+db_pool_timeout = 30  # 连接全部被占用时等待的秒数
+db_pool_ping_seconds = 30  # 连接空闲超过该秒数，取出时先检查是否可用
+db_schema_cache_seconds = 600  # 表结构缓存有效秒数，其他进程建表后最多这么久可见
 
 # 使用环境变量获得数据库,docker -e 传递
 _db_host = os.environ.get('db_host')
@@ -34,6 +45,18 @@ if _db_database is not None:
 _db_port = os.environ.get('db_port')
 if _db_port is not None:
     db_port = int(_db_port)
+_db_batch_size = os.environ.get('db_batch_size')
+if _db_batch_size is not None:
+    db_batch_size = int(_db_batch_size)
+_db_pool_size = os.environ.get('db_pool_size')
+if _db_pool_size is not None:
+    db_pool_size = int(_db_pool_size)
+_db_pool_max_overflow = os.environ.get('db_pool_max_overflow')
+if _db_pool_max_overflow is not None:
+    db_pool_max_overflow = int(_db_pool_max_overflow)
+_db_schema_cache_seconds = os.environ.get('db_schema_cache_seconds')
+if _db_schema_cache_seconds is not None:
+    db_schema_cache_seconds = int(_db_schema_cache_seconds)
 
 MYSQL_CONN_URL = "mysql+pymysql://%s:%s@%s:%s/%s?charset=%s" % (
     db_user, db_password, db_host, db_port, db_database, db_charset)
@@ -46,25 +69,271 @@ MYSQL_CONN_TORNDB = {'host': f'{db_host}:{str(db_port)}', 'user': db_user, 'pass
                      'database': db_database, 'charset': db_charset, 'max_idle_time': 3600, 'connect_timeout': 1000}
 
 
+_engines = {}
+_engines_lock = threading.Lock()
+_engine_stats = collections.Counter()
+
+
 # 通过数据库链接 engine
+# 每个数据库只创建一个engine，进程内共享其连接池。
 def engine():
-    return create_engine(MYSQL_CONN_URL)
+    return engine_to_db(None)
 
 
 def engine_to_db(to_db):
-    _engine = create_engine(MYSQL_CONN_URL.replace(f'/{db_database}?', f'/{to_db}?'))
+    _engine = _engines.get(to_db)
+    if _engine is not None:
+        return _engine
+    with _engines_lock:
+        _engine = _engines.get(to_db)
+        if _engine is None:
+            url = MYSQL_CONN_URL if to_db is None else MYSQL_CONN_URL.replace(f'/{db_database}?', f'/{to_db}?')
+            _engine = create_engine(url, pool_size=db_pool_size, max_overflow=db_pool_max_overflow,
+                                    pool_timeout=db_pool_timeout, pool_pre_ping=True, pool_recycle=3600)
+            event.listen(_engine, 'connect', lambda *args: _engine_stats.update(['connects']))
+            event.listen(_engine, 'checkout', lambda *args: _engine_stats.update(['checkouts']))
+            _engines[to_db] = _engine
     return _engine
 
 
+# 连接池中取出的连接，with结束时归还连接池
+class pooled_connection:
+    def __init__(self, pool, conn, overflow):
+        self._pool = pool
+        self._conn = conn
+        self._overflow = overflow
+
+    def __enter__(self):
+        return self._conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(discard=exc_type is not None)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self, discard=False):
+        if self._conn is not None:
+            self._pool.release(self._conn, self._overflow, discard)
+            self._conn = None
+
+
+# DB Api 连接池，进程内共享。
+# 保持db_pool_size个连接，用满时再临时创建最多db_pool_max_overflow个，归还时关闭；全部占用时等待。
+class connection_pool(metaclass=singleton_type):
+    def __init__(self):
+        self._idle = collections.deque()  # (连接, 归还时间)
+        self._opened = 0
+        self._cond = threading.Condition()
+        self._stats = collections.Counter()
+
+    def _connect(self):
+        self._stats['connects'] += 1
+        return pymysql.connect(**MYSQL_CONN_DBAPI)
+
+    def _alive(self, conn, idle_since):
+        if time.monotonic() - idle_since < db_pool_ping_seconds:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            self._stats['ping_failed'] += 1
+            return False
+
+    def acquire(self):
+        with self._cond:
+            self._stats['checkouts'] += 1
+            deadline = None
+            while not self._idle and self._opened >= db_pool_size + db_pool_max_overflow:
+                if deadline is None:
+                    self._stats['waits'] += 1
+                    deadline = time.monotonic() + db_pool_timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise TimeoutError(f"数据库连接池已满：{self._opened}个连接全部被占用")
+                self._cond.wait(remaining)
+            item = self._idle.pop() if self._idle else None
+            overflow = item is None and self._opened >= db_pool_size
+            if overflow:
+                self._stats['overflows'] += 1
+            self._opened += 1
+        if item is not None:
+            conn, idle_since = item
+            if self._alive(conn, idle_since):
+                self._stats['reused'] += 1
+                return pooled_connection(self, conn, False)
+            self._close(conn)
+        try:
+            return pooled_connection(self, self._connect(), overflow)
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, overflow=False, discard=False):
+        if discard or overflow or not conn.open:
+            self._close(conn)
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._opened -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data['idle'] = len(self._idle)
+            data['in_use'] = self._opened
+        return data
+
+
 # DB Api -数据库连接对象connection
+# 从连接池取出，使用with语句或调用close()归还。
 def get_connection():
     try:
-        return pymysql.connect(**MYSQL_CONN_DBAPI)
+        return connection_pool().acquire()
     except Exception as e:
         logging.error(f"database.conn_not_cursor处理异常：{MYSQL_CONN_DBAPI}{e}")
     return None
 
 
+def pool_stats():
+    """
+    :return: {'dbapi': DB Api连接池统计, 'engine': engine连接池统计}
+    """
+    return {'dbapi': connection_pool().stats(), 'engine': dict(_engine_stats)}
+
+
+def log_pool_stats():
+    data = pool_stats()
+    dbapi = data['dbapi']
+    logging.info(f"database：DB Api连接池 取出{dbapi.get('checkouts', 0)}次，新建连接{dbapi.get('connects', 0)}个，"
+                 f"复用{dbapi.get('reused', 0)}次，等待{dbapi.get('waits', 0)}次，超出{dbapi.get('overflows', 0)}次，"
+                 f"检查失效{dbapi.get('ping_failed', 0)}次；engine连接池 取出{data['engine'].get('checkouts', 0)}次，"
+                 f"新建连接{data['engine'].get('connects', 0)}个")
+
+
+# 数据库表结构缓存，进程内共享。
+# 每个数据库一次查询information_schema读出全部表的字段、主键和索引，本进程执行DDL后失效重新读取。
+class schema_cache(metaclass=singleton_type):
+    def __init__(self):
+        self._schemas = {}  # 数据库名: (读取时间, {表名: {'columns', 'primary_key', 'indexes'}})
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _load(self, schema):
+        tables = {}
+        with get_connection() as conn:
+            with conn.cursor() as db:
+                db.execute("SELECT `TABLE_NAME` FROM information_schema.tables WHERE `TABLE_SCHEMA` = %s",
+                           (schema,))
+                for (table_name,) in db.fetchall():
+                    tables[table_name] = {'columns': [], 'primary_key': [], 'indexes': {}}
+                db.execute("SELECT `TABLE_NAME`, `COLUMN_NAME` FROM information_schema.columns "
+                           "WHERE `TABLE_SCHEMA` = %s ORDER BY `TABLE_NAME`, `ORDINAL_POSITION`", (schema,))
+                for table_name, column_name in db.fetchall():
+                    if table_name in tables:
+                        tables[table_name]['columns'].append(column_name)
+                db.execute("SELECT `TABLE_NAME`, `INDEX_NAME`, `COLUMN_NAME` FROM information_schema.statistics "
+                           "WHERE `TABLE_SCHEMA` = %s ORDER BY `TABLE_NAME`, `INDEX_NAME`, `SEQ_IN_INDEX`", (schema,))
+                for table_name, index_name, column_name in db.fetchall():
+                    if table_name not in tables:
+                        continue
+                    if index_name == 'PRIMARY':
+                        tables[table_name]['primary_key'].append(column_name)
+                    else:
+                        tables[table_name]['indexes'].setdefault(index_name, []).append(column_name)
+        self.loads += 1
+        return tables
+
+    def tables(self, to_db=None):
+        """
+        :return: {表名: {'columns': 字段列表, 'primary_key': 主键字段列表, 'indexes': {索引名: 字段列表}}}
+        """
+        schema = to_db or db_database
+        with self._lock:
+            cached = self._schemas.get(schema)
+            if cached is None or time.monotonic() - cached[0] > db_schema_cache_seconds:
+                cached = self._schemas[schema] = (time.monotonic(), self._load(schema))
+            return cached[1]
+
+    def table(self, table_name, to_db=None):
+        return self.tables(to_db).get(table_name)
+
+    def invalidate(self, to_db=None):
+        with self._lock:
+            self._schemas.pop(to_db or db_database, None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._schemas = {}
+
+
+# 按声明的字段类型、主键和索引建表；表已存在时在一条ALTER TABLE中补齐缺少的字段、主键和索引。
+def sync_table(table_name, cols_type, primary_keys, indexes=None):
+    """
+    :param cols_type: {字段: sqlalchemy类型}
+    :param primary_keys: 主键字段，如('date', 'code')
+    :param indexes: 二级索引，如{'INIX_DATETIME': ('datetime',)}
+    :return: 建表或修改的内容，没有变化时为空列表
+    """
+    indexes = indexes or {}
+    table = schema_cache().table(table_name)
+    if table is None:
+        _table = Table(table_name, MetaData(),
+                       *[Column(k, cols_type[k], primary_key=k in primary_keys, autoincrement=False)
+                         for k in cols_type],
+                       *[Index(name, *cols) for name, cols in indexes.items()],
+                       mysql_charset=db_charset)
+        try:
+            _table.create(engine(), checkfirst=True)
+        except Exception as e:
+            logging.error(f"database.sync_table处理异常：{table_name}表{e}")
+            return []
+        finally:
+            schema_cache().invalidate()
+        return [f"CREATE TABLE `{table_name}`"]
+
+    dialect = engine().dialect
+    changes = []
+    for k in cols_type:
+        if k not in table['columns']:
+            changes.append(f"ADD COLUMN `{k}` {to_instance(cols_type[k]).compile(dialect=dialect)} NULL")
+    if not table['primary_key']:
+        changes.append(f"ADD PRIMARY KEY ({','.join(f'`{k}`' for k in primary_keys)})")
+    existing = list(table['indexes'].values())
+    for name, cols in indexes.items():
+        if name not in table['indexes'] and list(cols) not in existing:
+            changes.append(f"ADD INDEX `{name}`({','.join(f'`{k}`' for k in cols)})")
+    if not changes:
+        return changes
+    try:
+        # 一条语句只重建一次表
+        with get_connection() as conn:
+            with conn.cursor() as db:
+                db.execute(f"ALTER TABLE `{table_name}` {', '.join(changes)}")
+        logging.info(f"database.sync_table：{table_name}表{changes}")
+        return changes
+    except Exception as e:
+        logging.error(f"database.sync_table处理异常：{table_name}表{changes}{e}")
+    finally:
+        schema_cache().invalidate()
+    return []
+
+
 # 定义通用方法函数，插入数据库表，并创建数据库主键，保证重跑数据的时候索引唯一。
 def insert_db_from_df(data, table_name, cols_type, write_index, primary_keys, indexs=None):
     # 插入默认的数据库。
@@ -74,13 +343,8 @@ def insert_db_from_df(data, table_name, cols_type, write_index, primary_keys, in
 # 增加一个插入到其他数据库的方法。
 def insert_other_db_from_df(to_db, data, table_name, cols_type, write_index, primary_keys, indexs=None):
     # 定义engine
-    if to_db is None:
-        engine_mysql = engine()
-    else:
-        engine_mysql = engine_to_db(to_db)
-    # 使用 http://docs.sqlalchemy.org/en/latest/core/reflection.html
-    # 使用检查检查数据库表是否有主键。
-    ipt = inspect(engine_mysql)
+    engine_mysql = engine_to_db(to_db)
+    table_exist = checkTableIsExist(table_name, to_db)
     col_name_list = data.columns.tolist()
     # 如果有索引，把索引增加到varchar上面。
     if write_index:
@@ -98,76 +362,161 @@ def insert_other_db_from_df(to_db, data, table_name, cols_type, write_index, pri
                         dtype=cols_type, index=write_index, )
     except Exception as e:
         logging.error(f"database.insert_other_db_from_df处理异常：{table_name}表{e}")
-
+    if table_exist:
+        return
+    # to_sql新建了表
+    schema_cache().invalidate(to_db)
+    table = schema_cache().table(table_name, to_db)
     # 判断是否存在主键
-    if not ipt.get_pk_constraint(table_name)['constrained_columns']:
+    if table is not None and not table['primary_key']:
+        _table_name = f"`{table_name}`" if to_db is None else f"`{to_db}`.`{table_name}`"
         try:
             # 执行数据库插入数据。
             with get_connection() as conn:
                 with conn.cursor() as db:
-                    db.execute(f'ALTER TABLE `{table_name}` ADD PRIMARY KEY ({primary_keys});')
+                    db.execute(f'ALTER TABLE {_table_name} ADD PRIMARY KEY ({primary_keys});')
                     if indexs is not None:
                         for k in indexs:
-                            db.execute(f'ALTER TABLE `{table_name}` ADD INDEX IN{k}({indexs[k]});')
+                            db.execute(f'ALTER TABLE {_table_name} ADD INDEX IN{k}({indexs[k]});')
         except Exception as e:
             logging.error(f"database.insert_other_db_from_df处理异常：{table_name}表{e}")
+        schema_cache().invalidate(to_db)
 
 
-# 更新数据
-def update_db_from_df(data, table_name, where):
-    data = data.where(data.notnull(), None)
-    update_string = f'UPDATE `{table_name}` set '
-    where_string = ' where '
-    cols = tuple(data.columns)
-    with get_connection() as conn:
+def _df_rows(data):
+    # 转为python对象，NaN转为NULL
+    return data.astype(object).where(data.notnull(), None).values.tolist()
+
+
+# 批量替换数据：在一个事务中删除where条件的旧数据，再用多行INSERT ... ON DUPLICATE KEY UPDATE写入。
+# 表不存在时按cols_type建表并创建主键。
+def replace_db_from_df(data, table_name, cols_type, primary_keys, where=None, indexs=None, batch_size=None):
+    """
+    删除旧数据和写入新数据在同一个事务中，失败时回滚，表中不会出现旧数据已删、新数据没写入的情况。
+    任务重跑时用where={'date': date}替换当天的数据
+    :param cols_type: 建表时的字段类型
+    :param primary_keys: 建表时的主键，如"`date`,`code`"
+    :param where: 需要替换的旧数据条件，如{'date': date}，为空时只做upsert
+    :param batch_size: 每条INSERT语句的行数，默认db_batch_size
+    :return: 写入的行数
+    """
+    if data is None or len(data.index) == 0:
+        return 0
+    if not checkTableIsExist(table_name):
+        insert_db_from_df(data, table_name, cols_type, False, primary_keys, indexs)
+        return len(data.index)
+    batch_size = batch_size or db_batch_size
+    cols = [f"`{c}`" for c in data.columns]
+    sql = (f"INSERT INTO `{table_name}` ({','.join(cols)}) VALUES ({','.join(['%s'] * len(cols))}) "
+           f"ON DUPLICATE KEY UPDATE {','.join(f'{c}=VALUES({c})' for c in cols)}")
+    rows = _df_rows(data)
+    conn = get_connection()
+    if conn is None:
+        return 0
+    discard = False
+    try:
+        # 连接池中的连接是自动提交的，显式开启事务
+        conn.begin()
         with conn.cursor() as db:
-            try:
-                for row in data.values:
-                    sql = update_string
-                    sql_where = where_string
-                    for index, col in enumerate(cols):
-                        if col in where:
-                            if len(sql_where) == len(where_string):
-                                if type(row[index]) == str:
-                                    sql_where = f'''{sql_where}`{col}` = '{row[index]}' '''
-                                else:
-                                    sql_where = f'''{sql_where}`{col}` = {row[index]} '''
-                            else:
-                                if type(row[index]) == str:
-                                    sql_where = f'''{sql_where} and `{col}` = '{row[index]}' '''
-                                else:
-                                    sql_where = f'''{sql_where} and `{col}` = {row[index]} '''
-                        else:
-                            if type(row[index]) == str:
-                                if row[index] is None or row[index] != row[index]:
-                                    sql = f'''{sql}`{col}` = NULL, '''
-                                else:
-                                    sql = f'''{sql}`{col}` = '{row[index]}', '''
-                            else:
-                                if row[index] is None or row[index] != row[index]:
-                                    sql = f'''{sql}`{col}` = NULL, '''
-                                else:
-                                    sql = f'''{sql}`{col}` = {row[index]}, '''
-                    sql = f'{sql[:-2]}{sql_where}'
-                    db.execute(sql)
-            except Exception as e:
-                logging.error(f"database.update_db_from_df处理异常：{sql}{e}")
+            if where:
+                db.execute(f"DELETE FROM `{table_name}` WHERE {' AND '.join(f'`{k}` = %s' for k in where)}",
+                           tuple(where.values()))
+            for i in range(0, len(rows), batch_size):
+                # pymysql会把executemany的INSERT ... VALUES合并为多行语句
+                db.executemany(sql, rows[i:i + batch_size])
+        conn.commit()
+        return len(rows)
+    except Exception as e:
+        discard = True
+        conn.rollback()
+        logging.error(f"database.replace_db_from_df处理异常：{table_name}表{e}")
+    finally:
+        conn.close(discard)
+    return 0
 
 
-# 检查表是否存在
-def checkTableIsExist(tableName):
-    with get_connection() as conn:
+# 按tablestructure的表结构替换数据，字段类型取表结构中data实际包含的字段。
+def replace_table_from_df(data, table, primary_keys, where=None):
+    """
+    :param table: tablestructure中的表结构，如tbs.TABLE_CN_STOCK_SPOT
+    """
+    if data is None or len(data.index) == 0:
+        return 0
+    cols = table['columns']
+    cols_type = {k: cols[k]['type'] for k in data.columns if k in cols}
+    return replace_db_from_df(data, table['name'], cols_type, primary_keys, where)
+
+
+# 批量更新数据：先把数据批量写入同结构的临时表，再用一条UPDATE ... JOIN按where字段更新到原表。
+# 取代逐行拼接UPDATE语句，参数绑定传值，每个表只有几次往返。
+def update_db_from_df(data, table_name, where, batch_size=None):
+    """
+    :param where: 关联字段，如('date', 'code')，其余字段为需要更新的字段
+    :param batch_size: 每条INSERT语句的行数，默认db_batch_size
+    :return: 更新的行数
+    """
+    if data is None or len(data.index) == 0:
+        return 0
+    start = time.time()
+    batch_size = batch_size or db_batch_size
+    tmp_table = f"_tmp_{table_name}"
+    cols = [f"`{c}`" for c in data.columns]
+    insert_sql = f"INSERT INTO `{tmp_table}` ({','.join(cols)}) VALUES ({','.join(['%s'] * len(cols))})"
+    join_sql = ' AND '.join(f"t.`{c}` = s.`{c}`" for c in where)
+    set_sql = ','.join(f"t.`{c}` = s.`{c}`" for c in data.columns if c not in where)
+    update_sql = f"UPDATE `{table_name}` t JOIN `{tmp_table}` s ON {join_sql} SET {set_sql}"
+    rows = _df_rows(data)
+    conn = get_connection()
+    if conn is None:
+        return 0
+    discard = False
+    try:
+        # 连接池中的连接是自动提交的，显式开启事务
+        conn.begin()
         with conn.cursor() as db:
-            db.execute("""
-                SELECT COUNT(*)
-                FROM information_schema.tables
-                WHERE table_name = '{0}'
-                """.format(tableName.replace('\'', '\'\'')))
-            if db.fetchone()[0] == 1:
-                return True
+            # 临时表只在当前连接可见，结构和主键与原表一致
+            db.execute(f"CREATE TEMPORARY TABLE `{tmp_table}` LIKE `{table_name}`")
+            for i in range(0, len(rows), batch_size):
+                db.executemany(insert_sql, rows[i:i + batch_size])
+            updated = db.execute(update_sql)
+            db.execute(f"DROP TEMPORARY TABLE `{tmp_table}`")
+        conn.commit()
+        logging.info(f"database.update_db_from_df：{table_name}表更新{updated}行，"
+                     f"共{len(rows)}行，耗时{time.time() - start:.2f}秒")
+        return updated
+    except Exception as e:
+        discard = True  # 临时表可能还在，不再放回连接池
+        conn.rollback()
+        logging.error(f"database.update_db_from_df处理异常：{table_name}表{e}")
+    finally:
+        conn.close(discard)
+    return 0
+
+
+# 检查表是否存在
+def checkTableIsExist(tableName, to_db=None):
+    try:
+        return schema_cache().table(tableName, to_db) is not None
+    except Exception as e:
+        logging.error(f"database.checkTableIsExist处理异常：{tableName}表{e}")
     return False
 
 
+# 表的字段列表，表不存在时返回None
+def get_table_columns(table_name, to_db=None):
+    table = schema_cache().table(table_name, to_db)
+    return None if table is None else list(table['columns'])
+
+
+# 表的主键字段列表，表不存在时返回None
+def get_primary_key(table_name, to_db=None):
+    table = schema_cache().table(table_name, to_db)
+    return None if table is None else list(table['primary_key'])
+
+
+_DDL_PREFIXES = ('CREATE', 'ALTER', 'DROP', 'RENAME')
+
+
 # 增删改数据
 def executeSql(sql, params=()):
     with get_connection() as conn:
@@ -176,6 +525,9 @@ def executeSql(sql, params=()):
                 db.execute(sql, params)
             except Exception as e:
                 logging.error(f"database.executeSql处理异常：{sql}{e}")
+    if sql.lstrip().upper().startswith(_DDL_PREFIXES):
+        # 本进程修改了表结构
+        schema_cache().invalidate_all()
 
 
 # 查询数据
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import threading
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+
+# 延迟导入的模块，第一次访问属性时才真正导入。
+# 用于爬虫模块等导入时就会读取配置、创建会话的重量级依赖，缩短只用到其中一部分功能的作业的启动时间。
+class lazy_module:
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._load(), key, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return f"<lazy_module '{self.__dict__['_name']}'>"
+
+
+def lazy_import(name):
+    """
+    :param name: 模块全名，如'instock.core.crawling.stock_hist_em'
+    :return: 延迟导入的模块
+    """
+    return lazy_module(name)
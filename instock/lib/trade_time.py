@@ -19,35 +19,37 @@ def is_trade_date(date=None):
 
 
 def get_previous_trade_date(date, count=1):
-    while True:
-        date =  get_one_previous_trade_date(date)
-        count -= 1
-        if count == 0:
-            break
-    return date
+    trade_date = stock_trade_date().get_data()
+    if trade_date is None:
+        return date
+    return trade_date.previous(date, count)
+
 
 def get_one_previous_trade_date(date):
+    return get_previous_trade_date(date)
+
+
+def get_next_trade_date(date, count=1):
     trade_date = stock_trade_date().get_data()
     if trade_date is None:
         return date
-    tmp_date = date
-    while True:
-        tmp_date += datetime.timedelta(days=-1)
-        if tmp_date in trade_date:
-            break
-    return tmp_date
+    return trade_date.next(date, count)
 
 
-def get_next_trade_date(date):
+# [start, end]区间内的交易日数
+def get_trade_date_count(start, end):
     trade_date = stock_trade_date().get_data()
     if trade_date is None:
-        return date
-    tmp_date = date
-    while True:
-        tmp_date += datetime.timedelta(days=1)
-        if tmp_date in trade_date:
-            break
-    return tmp_date
+        return 0
+    return trade_date.count(start, end)
+
+
+# [start, end]区间内的交易日列表
+def get_trade_dates(start, end):
+    trade_date = stock_trade_date().get_data()
+    if trade_date is None:
+        return []
+    return trade_date.range(start, end)
 
 
 OPEN_TIME = (
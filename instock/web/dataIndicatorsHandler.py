@@ -5,7 +5,6 @@ from abc import ABC
 from tornado import gen
 import logging
 import instock.core.stockfetch as stf
-import instock.core.kline.visualization as vis
 import instock.web.base as webBase
 
 __author__ = 'myh '
@@ -16,6 +15,7 @@ __date__ = '2023/3/10 '
 class GetDataIndicatorsHandler(webBase.BaseHandler, ABC):
     @gen.coroutine
     def get(self):
+        import instock.core.kline.visualization as vis  # bokeh导入较慢，第一次打开指标页面时才导入
         code = self.get_argument("code", default=None, strip=False)
         date = self.get_argument("date", default=None, strip=False)
         name = self.get_argument("name", default=None, strip=False)
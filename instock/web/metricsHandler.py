@@ -0,0 +1,22 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import json
+from abc import ABC
+import tornado.web
+from instock.core.fetch_metrics import fetch_metrics
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+
+# 数据抓取统计：last_run为最近一次作业运行的按接口统计，web为web服务进程自身的抓取统计。
+# 不访问数据库，不继承BaseHandler。
+class GetMetricsHandler(tornado.web.RequestHandler, ABC):
+    def get(self):
+        self.set_header('Content-Type', 'application/json;charset=UTF-8')
+        data = {
+            'last_run': fetch_metrics.load(),
+            'web': fetch_metrics().snapshot(),
+        }
+        self.write(json.dumps(data, ensure_ascii=False))
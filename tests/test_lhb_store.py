@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import os.path
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+
+cpath = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(cpath)
+import instock.lib.trade_time as trd
+import instock.core.lhb_store as lhs
+
+__author__ = 'myh '
+__date__ = '2026/10/17 '
+
+
+class lhb_store_test(unittest.TestCase):
+    def setUp(self):
+        # 最近的交易日是昨天，发布截止时间已过
+        today = datetime.date.today()
+        self.calendar = [today - datetime.timedelta(days=i) for i in range(20, 0, -1)]
+        self.last = self.calendar[-1]
+        self.calls = []
+        self.root = tempfile.mkdtemp()
+        patches = (
+            mock.patch.object(trd, 'get_trade_dates',
+                              lambda start, end: [d for d in self.calendar if start <= d <= end]),
+            mock.patch.object(trd, 'is_trade_date', lambda date=None: date in self.calendar),
+            mock.patch.object(trd, 'get_previous_trade_date',
+                              lambda date, count=1: [d for d in self.calendar if d < date][-count]),
+        )
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _fetch(self, start, end):
+        self.calls.append((start, end))
+        dates = [d for d in self.calendar if start <= d.strftime("%Y%m%d") <= end]
+        return pd.DataFrame({'上榜日期': dates, 'value': range(len(dates))})
+
+    def _store(self, mutable_days=0):
+        return lhs.lhb_store('jgmmtj', self._fetch, '上榜日期', mutable_days=mutable_days, root=self.root)
+
+    def _touch(self, store, date, time):
+        ts = datetime.datetime.combine(date, time).timestamp()
+        os.utime(store._file(date), (ts, ts))
+
+    def test_partition_saved_before_publish_is_refetched(self):
+        store = self._store()
+        store.load(self.calendar[0], self.last)
+        # 收盘后不久保存的最新交易日，数据可能还没发布完整
+        self._touch(store, self.last, datetime.time(15, 5, 0))
+        self.calls.clear()
+        store.load(self.calendar[0], self.last)
+        self.assertEqual(self.calls, [(self.last.strftime("%Y%m%d"), self.last.strftime("%Y%m%d"))])
+        # 重新抓取后保存时间已过发布截止时间，不再请求
+        self.calls.clear()
+        store.load(self.calendar[0], self.last)
+        self.assertEqual(self.calls, [])
+
+    def test_partition_saved_after_publish_is_kept(self):
+        store = self._store()
+        store.load(self.calendar[0], self.last)
+        self._touch(store, self.last, datetime.time(21, 0, 0))
+        self.calls.clear()
+        store.load(self.calendar[0], self.last)
+        self.assertEqual(self.calls, [])
+
+    def test_mutable_days_refetched_once_per_publish(self):
+        store = self._store(mutable_days=3)
+        store.load(self.calendar[0], self.last)
+        # 每个分区都在当天发布之后保存
+        for date in self.calendar:
+            self._touch(store, date, datetime.time(21, 0, 0))
+        self.calls.clear()
+        store.load(self.calendar[0], self.last)
+        # 可变窗口内、在最近一次发布之前保存的只有上一个交易日
+        previous = self.calendar[-2].strftime("%Y%m%d")
+        self.assertEqual(self.calls, [(previous, previous)])
+
+
+if __name__ == '__main__':
+    unittest.main()